@@ -0,0 +1,262 @@
+"""
+batch_autotuner.py
+Memory-aware batch size autotuner for the multi-engine orchestrator.
+
+Remembers the largest batch that ran safely per (engine, device, chunk length),
+halves and retries on out-of-memory errors instead of failing the job, and
+grows the batch again once free memory climbs back above what it was at the
+last OOM. The free-memory probe is injectable, so the whole loop can be
+exercised on CPU against a simulated memory limit.
+"""
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+MemoryProbe = Callable[[str], Optional[float]]
+
+
+def is_oom_error(exc: BaseException) -> bool:
+    """Return True if ``exc`` looks like an out-of-memory failure (CUDA or host)."""
+    if isinstance(exc, MemoryError):
+        return True
+    if type(exc).__name__ == "OutOfMemoryError":  # torch.cuda.OutOfMemoryError
+        return True
+    return isinstance(exc, RuntimeError) and "out of memory" in str(exc).lower()
+
+
+def cuda_free_memory_gb(device: str) -> Optional[float]:
+    """Default probe: free memory in GB on a CUDA device, None if unknown."""
+    if not device.startswith("cuda"):
+        return None
+    try:
+        import torch
+    except ImportError:
+        return None
+    if not torch.cuda.is_available():
+        return None
+    index = int(device.split(":", 1)[1]) if ":" in device else 0
+    free_bytes, _total = torch.cuda.mem_get_info(index)
+    return free_bytes / 1024 ** 3
+
+
+def _release_cached_memory(device: str) -> None:
+    """Hand cached allocator blocks back before retrying a smaller batch."""
+    if not device.startswith("cuda"):
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+@dataclass
+class BatchState:
+    """What the autotuner has learned about one (engine, device, chunk) key."""
+    batch_size: int
+    safe_batch: int = 0                     # largest batch that has succeeded
+    ceiling: Optional[int] = None           # smallest batch that has OOM'd
+    free_at_oom: Optional[float] = None     # probe reading when ceiling was set
+    successes: int = 0                      # consecutive successes at batch_size
+
+
+class BatchAutotuner:
+    """
+    Probe, remember and adapt batch sizes per (engine, device, chunk length).
+
+    Args:
+        memory_probe: Callable returning free memory in GB for a device string
+            (None when unknown). Defaults to ``cuda_free_memory_gb``.
+        min_batch: Smallest batch tried before an OOM is re-raised.
+        max_batch: Upper bound for growth.
+        grow_after: Consecutive successes required before trying a larger batch.
+        headroom_ratio: Free memory must exceed ``free_at_oom * headroom_ratio``
+            before a remembered OOM ceiling is lifted.
+        chunk_bucket_seconds: Chunk lengths are rounded up to this granularity;
+            pass the window length the engine actually batches (e.g. 30s for
+            Whisper, 25s for Distil-Whisper) so each gets its own entry.
+        state_path: Optional JSON file used to persist learned batch sizes.
+    """
+
+    def __init__(
+        self,
+        memory_probe: Optional[MemoryProbe] = None,
+        min_batch: int = 1,
+        max_batch: int = 64,
+        grow_after: int = 3,
+        headroom_ratio: float = 1.5,
+        chunk_bucket_seconds: float = 1.0,
+        state_path: Optional[str] = None
+    ):
+        self.memory_probe = memory_probe or cuda_free_memory_gb
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.grow_after = grow_after
+        self.headroom_ratio = headroom_ratio
+        self.chunk_bucket_seconds = chunk_bucket_seconds
+        self.state_path = state_path
+        self.states: Dict[Tuple[str, str, int], BatchState] = {}
+        self._load()
+
+    def key(self, engine, device: str, chunk_seconds: float) -> Tuple[str, str, int]:
+        """Normalize an (engine, device, chunk length) triple into a state key."""
+        engine_name = getattr(engine, "value", str(engine))
+        buckets = max(1, math.ceil(chunk_seconds / self.chunk_bucket_seconds))
+        return engine_name, device, int(buckets * self.chunk_bucket_seconds)
+
+    def suggest(self, engine, device: str, chunk_seconds: float, default: int) -> int:
+        """Batch size to use next; ``default`` seeds keys that were never seen."""
+        key = self.key(engine, device, chunk_seconds)
+        state = self.states.get(key)
+        if state is None:
+            state = BatchState(batch_size=self._clamp(default))
+            self.states[key] = state
+        self._maybe_lift_ceiling(state, device)
+        return state.batch_size
+
+    def record_success(self, engine, device: str, chunk_seconds: float, batch_size: int) -> None:
+        """Remember that ``batch_size`` fit and grow once enough runs have succeeded."""
+        state = self._state(engine, device, chunk_seconds, batch_size)
+        state.safe_batch = max(state.safe_batch, batch_size)
+        if batch_size != state.batch_size:
+            self._save()
+            return
+        state.successes += 1
+        self._maybe_lift_ceiling(state, device)
+        if state.successes >= self.grow_after:
+            if state.ceiling is None:
+                grown = min(state.batch_size * 2, self.max_batch)
+            else:
+                # Bisect towards the known failure point instead of doubling into it
+                grown = (state.batch_size + state.ceiling) // 2
+            if grown > state.batch_size:
+                state.batch_size = grown
+                state.successes = 0
+        self._save()
+
+    def record_oom(self, engine, device: str, chunk_seconds: float, batch_size: int) -> Optional[int]:
+        """
+        Back off after an OOM at ``batch_size``.
+
+        Returns:
+            The smaller batch size to retry with, or None if already at ``min_batch``.
+        """
+        state = self._state(engine, device, chunk_seconds, batch_size)
+        state.ceiling = batch_size if state.ceiling is None else min(state.ceiling, batch_size)
+        state.free_at_oom = self.memory_probe(device)
+        state.successes = 0
+        if state.safe_batch >= batch_size:
+            state.safe_batch = 0  # conditions changed; the old "safe" size no longer is
+        if batch_size <= self.min_batch:
+            state.batch_size = self.min_batch
+            self._save()
+            return None
+        fallback = batch_size // 2
+        if 0 < state.safe_batch < batch_size:
+            fallback = max(fallback, state.safe_batch)
+        state.batch_size = max(self.min_batch, fallback)
+        self._save()
+        return state.batch_size
+
+    async def run(
+        self,
+        engine,
+        device: str,
+        chunk_seconds: float,
+        default: int,
+        work: Callable[[int], Awaitable[T]]
+    ) -> T:
+        """
+        Run ``work(batch_size)``, retrying with smaller batches on OOM.
+
+        Non-OOM errors propagate unchanged; an OOM at ``min_batch`` is re-raised.
+        """
+        batch_size = self.suggest(engine, device, chunk_seconds, default)
+        while True:
+            try:
+                result = await work(batch_size)
+            except Exception as exc:
+                if not is_oom_error(exc):
+                    raise
+                _release_cached_memory(device)
+                retry = self.record_oom(engine, device, chunk_seconds, batch_size)
+                if retry is None:
+                    raise
+                print(f"⚠️  OOM at batch {batch_size} on {device}, retrying with {retry}")
+                batch_size = retry
+                continue
+            self.record_success(engine, device, chunk_seconds, batch_size)
+            return result
+
+    def _state(self, engine, device: str, chunk_seconds: float, batch_size: int) -> BatchState:
+        key = self.key(engine, device, chunk_seconds)
+        if key not in self.states:
+            self.states[key] = BatchState(batch_size=self._clamp(batch_size))
+        return self.states[key]
+
+    def _clamp(self, batch_size: int) -> int:
+        return max(self.min_batch, min(self.max_batch, batch_size))
+
+    def _maybe_lift_ceiling(self, state: BatchState, device: str) -> None:
+        """Forget an OOM ceiling once the device has clearly more free memory."""
+        if state.ceiling is None or state.free_at_oom is None:
+            return
+        free = self.memory_probe(device)
+        if free is not None and free > state.free_at_oom * self.headroom_ratio:
+            state.ceiling = None
+            state.free_at_oom = None
+
+    def _load(self) -> None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for entry in entries:
+            key = (entry.pop("engine"), entry.pop("device"), entry.pop("chunk_seconds"))
+            self.states[key] = BatchState(**entry)
+
+    def _save(self) -> None:
+        if not self.state_path:
+            return
+        entries = [
+            {"engine": engine, "device": device, "chunk_seconds": chunk, **asdict(state)}
+            for (engine, device, chunk), state in self.states.items()
+        ]
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"  # workers on one host share the file
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    # Simulated CPU run: each batch item costs 1 GB against a 10 GB "device".
+    limit_gb = {"value": 10.0}
+
+    async def fake_transcribe(batch_size: int) -> int:
+        if batch_size > limit_gb["value"]:
+            raise MemoryError(f"simulated OOM at batch {batch_size}")
+        return batch_size
+
+    tuner = BatchAutotuner(memory_probe=lambda device: limit_gb["value"], grow_after=1)
+
+    async def demo():
+        for step in range(8):
+            if step == 5:
+                limit_gb["value"] = 40.0  # headroom returns
+            used = await tuner.run("whisper_large_v3_turbo", "cpu", 30.0, 16, fake_transcribe)
+            print(f"step {step}: batch {used}")
+
+    asyncio.run(demo())
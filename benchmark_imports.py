@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+benchmark_imports.py
+Import-time regression guard for the package and orchestrator.
+
+Each module is imported in a fresh interpreter and timed; the script fails if
+an import exceeds its budget or drags in a heavy dependency that should only
+load when an engine is first used.
+
+Usage: python benchmark_imports.py [--runs N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+
+ROOT = Path(__file__).resolve().parent
+
+# Module -> import-time budget in seconds (median of runs, fresh interpreter)
+BUDGETS = {
+    "forensic_transcriber": 0.5,
+    "multi_engine_orchestrator": 0.5,
+    "batch_autotuner": 0.2,
+    "cpu_backend": 0.2,
+}
+
+# Must not be imported as a side effect of importing any module above
+HEAVY_MODULES = ("torch", "librosa", "numpy", "whisper", "transformers", "pyannote", "nemo")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    """Median import time and any heavy modules loaded, over ``runs`` fresh interpreters."""
+    timings, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT,
+            text=True,
+            capture_output=True,
+            check=True,
+        )
+        sample = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(sample["seconds"])
+        heavy.update(sample["heavy"])
+    return {"seconds": median(timings), "heavy": sorted(heavy)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        result = measure(module, args.runs)
+        ok = result["seconds"] <= budget and not result["heavy"]
+        failed |= not ok
+        status = "OK  " if ok else "FAIL"
+        extra = f" | eager: {', '.join(result['heavy'])}" if result["heavy"] else ""
+        print(f"{status} {module:<28} {result['seconds'] * 1000:7.1f} ms (budget {budget * 1000:.0f} ms){extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+cluster.py
+Coordinator/worker mode for running AstronomicalOrchestrator on several hosts.
+
+Protocol: newline-delimited JSON over TCP or a Unix socket, one message per line,
+each with a "type" field.
+
+    worker -> coordinator
+        register   {worker_id, devices, engines}   devices and warm engines
+        pull       {}                              ask for the next job
+        heartbeat  {engines}                       liveness + current warm engines
+        result     {job_id, result}                finished job
+        error      {job_id, error}                 job failed on this worker
+    coordinator -> worker
+        registered {worker_id}
+        job        {job_id, file_path, case_id, device}
+        idle       {retry_after}                   nothing queued right now
+        shutdown   {}
+
+Workers pull, so a busy worker is never handed more than it asked for. Jobs of a
+worker that disconnects or misses heartbeats for ``heartbeat_timeout`` seconds go
+back to the front of the queue; a job that fails ``max_attempts`` times is failed.
+
+Jobs run on a dedicated thread with its own event loop, so a handler that blocks
+(model loading, GPU inference) never delays heartbeats. A worker that loses its
+connection reconnects and registers again, and exits once it runs out of attempts.
+
+Usage:
+    python cluster.py coordinator --port 8765
+    python cluster.py worker --connect 127.0.0.1:8765 [--gpu 0]
+    python cluster.py worker --unix /tmp/astro.sock --handler mymodule:process
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+STREAM_LIMIT = 64 * 1024 * 1024  # results are single JSON lines; allow large transcripts
+
+JobHandler = Callable[[str, Optional[str]], Awaitable[Dict]]
+
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict) -> None:
+    """Write one JSON line; non-JSON values (e.g. pyannote annotations) become strings."""
+    writer.write(json.dumps(message, default=str).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """Read one JSON line, or None when the peer has closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+@dataclass
+class Job:
+    job_id: str
+    file_path: str
+    case_id: Optional[str] = None
+    device: Optional[str] = None          # "cuda" / "cpu" requirement, None for any
+    engine: Optional[str] = None          # preferred engine, used to favour warm workers
+    attempts: int = 0
+    future: Optional[asyncio.Future] = None
+
+    def to_message(self) -> Dict:
+        return {
+            "type": "job",
+            "job_id": self.job_id,
+            "file_path": self.file_path,
+            "case_id": self.case_id,
+            "device": self.device,
+        }
+
+
+@dataclass
+class WorkerInfo:
+    worker_id: str
+    writer: asyncio.StreamWriter
+    devices: List[str] = field(default_factory=list)
+    engines: List[str] = field(default_factory=list)
+    last_seen: float = field(default_factory=time.monotonic)
+    jobs: Set[str] = field(default_factory=set)
+
+    def can_run(self, job: Job) -> bool:
+        return job.device is None or any(d.startswith(job.device) for d in self.devices)
+
+
+class Coordinator:
+    """
+    Job queue and worker registry.
+
+    Args:
+        heartbeat_timeout: Seconds without any message before a worker is dropped.
+        max_attempts: Times a job is handed out before it is failed for good.
+        idle_retry: Seconds an idle worker is told to wait before pulling again.
+    """
+
+    def __init__(self, heartbeat_timeout: float = 15.0, max_attempts: int = 3, idle_retry: float = 0.5):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.idle_retry = idle_retry
+        self.queue: Deque[Job] = deque()
+        self.running: Dict[str, Job] = {}
+        self.workers: Dict[str, WorkerInfo] = {}
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None):
+        """Start listening; returns the server so callers can read the bound address."""
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path, limit=STREAM_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port, limit=STREAM_LIMIT)
+        self._monitor = asyncio.create_task(self._monitor_heartbeats())
+        return self._server
+
+    async def stop(self, grace: float = 5.0) -> None:
+        """Tell workers to shut down, give them ``grace`` seconds to hang up, then close."""
+        for worker in list(self.workers.values()):
+            try:
+                await send_message(worker.writer, {"type": "shutdown"})
+            except (ConnectionError, RuntimeError):
+                pass
+        if self._monitor:
+            self._monitor.cancel()
+        if self._server:
+            self._server.close()
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=grace)
+        for task in self._connections:
+            task.cancel()
+        if self._server:
+            await self._server.wait_closed()
+
+    def submit(
+        self,
+        file_path: str,
+        case_id: Optional[str] = None,
+        device: Optional[str] = None,
+        engine: Optional[str] = None
+    ) -> asyncio.Future:
+        """Queue a file; the returned future resolves to the worker's result dict."""
+        job = Job(
+            job_id=f"job-{next(self._ids)}",
+            file_path=file_path,
+            case_id=case_id,
+            device=device,
+            engine=engine,
+            future=asyncio.get_running_loop().create_future()
+        )
+        self.queue.append(job)
+        return job.future
+
+    def _next_job_for(self, worker: WorkerInfo) -> Optional[Job]:
+        """First runnable job, preferring one whose engine is already warm on the worker."""
+        chosen = None
+        for job in self.queue:
+            if not worker.can_run(job):
+                continue
+            if job.engine and job.engine in worker.engines:
+                chosen = job
+                break
+            if chosen is None:
+                chosen = job
+        if chosen is not None:
+            self.queue.remove(chosen)
+        return chosen
+
+    def _requeue(self, job_id: str, reason: str) -> None:
+        job = self.running.pop(job_id, None)
+        if job is None or job.future.done():
+            return
+        if job.attempts >= self.max_attempts:
+            job.future.set_exception(RuntimeError(f"{job.job_id} failed after {job.attempts} attempts: {reason}"))
+            return
+        print(f"↩️  Reassigning {job.job_id} ({reason})")
+        self.queue.appendleft(job)
+
+    def _drop_worker(self, worker_id: str, reason: str) -> None:
+        worker = self.workers.pop(worker_id, None)
+        if worker is None:
+            return
+        for job_id in list(worker.jobs):
+            self._requeue(job_id, f"worker {worker_id} {reason}")
+        worker.writer.close()
+
+    async def _monitor_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_timeout / 3)
+            deadline = time.monotonic() - self.heartbeat_timeout
+            for worker_id, worker in list(self.workers.items()):
+                if worker.last_seen < deadline:
+                    self._drop_worker(worker_id, "missed heartbeats")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        worker: Optional[WorkerInfo] = None
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                kind = message.get("type")
+
+                if kind == "register":
+                    stale = self.workers.get(message["worker_id"])
+                    if stale is not None:
+                        self._drop_worker(stale.worker_id, "re-registered")
+                    worker = WorkerInfo(
+                        worker_id=message["worker_id"],
+                        writer=writer,
+                        devices=message.get("devices", []),
+                        engines=message.get("engines", [])
+                    )
+                    self.workers[worker.worker_id] = worker
+                    print(f"🛰️  Worker {worker.worker_id} registered: {worker.devices}")
+                    await send_message(writer, {"type": "registered", "worker_id": worker.worker_id})
+                    continue
+
+                if worker is None or self.workers.get(worker.worker_id) is not worker:
+                    break  # unregistered, or already dropped for missing heartbeats
+                worker.last_seen = time.monotonic()
+
+                if kind == "heartbeat":
+                    worker.engines = message.get("engines", worker.engines)
+
+                elif kind == "pull":
+                    job = self._next_job_for(worker)
+                    if job is None:
+                        await send_message(writer, {"type": "idle", "retry_after": self.idle_retry})
+                    else:
+                        job.attempts += 1
+                        self.running[job.job_id] = job
+                        worker.jobs.add(job.job_id)
+                        await send_message(writer, job.to_message())
+
+                elif kind == "result":
+                    job = self.running.pop(message["job_id"], None)
+                    worker.jobs.discard(message["job_id"])
+                    if job is not None and not job.future.done():
+                        job.future.set_result(message["result"])
+
+                elif kind == "error":
+                    worker.jobs.discard(message["job_id"])
+                    self._requeue(message["job_id"], message.get("error", "worker error"))
+        except (ConnectionError, json.JSONDecodeError) as exc:
+            print(f"⚠️  Worker connection error: {exc}")
+        except asyncio.CancelledError:
+            pass  # coordinator stopping
+        finally:
+            self._connections.discard(task)
+            if worker is not None and self.workers.get(worker.worker_id) is worker:
+                self._drop_worker(worker.worker_id, "disconnected")
+            else:
+                writer.close()
+
+
+def _default_handler(gpu_devices: List[int], work_dir: str = "."):
+    """Orchestrator-backed job handler plus callables describing the worker."""
+    from multi_engine_orchestrator import AstronomicalOrchestrator
+
+    orchestrator = AstronomicalOrchestrator(gpu_devices=gpu_devices, work_dir=work_dir)
+
+    async def handle(file_path: str, case_id: Optional[str]) -> Dict:
+        return await orchestrator.process_astronomical(file_path, case_id=case_id)
+
+    def warm_engines() -> List[str]:
+        # called from the heartbeat loop while the job thread may be loading engines
+        return [engine.value for engine, model in list(orchestrator.engines.items()) if model is not None]
+
+    return handle, [orchestrator.device], warm_engines
+
+
+class Worker:
+    """
+    Pulls jobs from a coordinator and streams results back.
+
+    Args:
+        handler: ``async (file_path, case_id) -> result dict``.
+        devices: Devices advertised at registration (e.g. ["cuda:0"]).
+        warm_engines: Callable listing engines currently loaded, sent with heartbeats.
+        heartbeat_interval: Seconds between heartbeats, also while a job runs.
+        reconnect_attempts: Consecutive failed connects before the worker gives up.
+        reconnect_delay: Initial seconds between connects, doubled after each failure.
+    """
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        devices: List[str],
+        warm_engines: Optional[Callable[[], List[str]]] = None,
+        worker_id: Optional[str] = None,
+        heartbeat_interval: float = 5.0,
+        reconnect_attempts: int = 5,
+        reconnect_delay: float = 1.0
+    ):
+        self.handler = handler
+        self.devices = devices
+        self.warm_engines = warm_engines or (lambda: [])
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self._write_lock = asyncio.Lock()
+        self._job_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None) -> None:
+        """Serve jobs until the coordinator says shutdown or stays unreachable."""
+        failures = 0
+        try:
+            while True:
+                try:
+                    if unix_path:
+                        reader, writer = await asyncio.open_unix_connection(unix_path, limit=STREAM_LIMIT)
+                    else:
+                        reader, writer = await asyncio.open_connection(host, port, limit=STREAM_LIMIT)
+                except OSError as exc:
+                    failures += 1
+                    if failures > self.reconnect_attempts:
+                        print(f"🔌 Worker {self.worker_id} giving up: {exc}")
+                        return
+                    await asyncio.sleep(self.reconnect_delay * 2 ** (failures - 1))
+                    continue
+                failures = 0
+                try:
+                    if await self._session(reader, writer):
+                        return
+                    print(f"🔌 Worker {self.worker_id} disconnected, reconnecting")
+                except (ConnectionError, asyncio.IncompleteReadError, json.JSONDecodeError) as exc:
+                    print(f"🔌 Worker {self.worker_id} lost connection ({exc!r}), reconnecting")
+        finally:
+            if self._job_loop is not None:
+                self._job_loop.call_soon_threadsafe(self._job_loop.stop)
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Register and serve one connection; True when told to shut down."""
+        await self._send(writer, {
+            "type": "register",
+            "worker_id": self.worker_id,
+            "devices": self.devices,
+            "engines": self.warm_engines()
+        })
+        heartbeat = asyncio.create_task(self._heartbeat(writer))
+        try:
+            while True:
+                await self._send(writer, {"type": "pull"})
+                message = await read_message(reader)
+                while message is not None and message["type"] == "registered":
+                    message = await read_message(reader)
+                if message is None:
+                    return False  # dropped by the coordinator, or it went away
+                if message["type"] == "shutdown":
+                    return True
+                if message["type"] == "idle":
+                    await asyncio.sleep(message.get("retry_after", 0.5))
+                    continue
+                if message["type"] == "job":
+                    await self._run_job(writer, message)
+        finally:
+            heartbeat.cancel()
+            writer.close()
+
+    async def _run_job(self, writer: asyncio.StreamWriter, job: Dict) -> None:
+        coro = self.handler(job["file_path"], job.get("case_id"))
+        try:
+            result = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._job_thread_loop()))
+        except Exception as exc:
+            await self._send(writer, {"type": "error", "job_id": job["job_id"], "error": repr(exc)})
+            return
+        await self._send(writer, {"type": "result", "job_id": job["job_id"], "result": result})
+
+    def _job_thread_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Event loop on a dedicated job thread, kept for the worker's lifetime so
+        handler state bound to a loop (loaded models, executor pools) is reused.
+        """
+        if self._job_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name=f"{self.worker_id}-jobs", daemon=True).start()
+            self._job_loop = loop
+        return self._job_loop
+
+    async def _heartbeat(self, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                await self._send(writer, {"type": "heartbeat", "engines": self.warm_engines()})
+        except ConnectionError:
+            pass  # the session loop notices on its next read or write
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict) -> None:
+        async with self._write_lock:  # heartbeats and results share one stream
+            await send_message(writer, message)
+
+
+def _load_handler(spec: str) -> Any:
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+async def _run_coordinator(args) -> None:
+    coordinator = Coordinator(heartbeat_timeout=args.heartbeat_timeout)
+    await coordinator.start(args.host, args.port, args.unix)
+    print(f"🚀 Coordinator listening on {args.unix or f'{args.host}:{args.port}'}")
+    futures = [coordinator.submit(path) for path in args.files]
+    if futures:
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            print(json.dumps(result, default=str)[:200])
+        await coordinator.stop()
+    else:
+        await asyncio.Event().wait()
+
+
+async def _run_worker(args) -> None:
+    if args.handler:
+        worker = Worker(
+            _load_handler(args.handler),
+            devices=["cpu"],
+            heartbeat_interval=args.heartbeat,
+            reconnect_attempts=args.reconnect_attempts
+        )
+    else:
+        handle, devices, warm = _default_handler(args.gpu, args.work_dir)
+        worker = Worker(handle, devices, warm, heartbeat_interval=args.heartbeat, reconnect_attempts=args.reconnect_attempts)
+    host, _, port = args.connect.rpartition(":")
+    await worker.run(host or "127.0.0.1", int(port), args.unix)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Multi-node orchestrator mode")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    coord = sub.add_parser("coordinator")
+    coord.add_argument("--host", default="127.0.0.1")
+    coord.add_argument("--port", type=int, default=8765)
+    coord.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    coord.add_argument("--heartbeat-timeout", type=float, default=15.0)
+    coord.add_argument("files", nargs="*", help="Files to process, then exit")
+
+    work = sub.add_parser("worker")
+    work.add_argument("--connect", default="127.0.0.1:8765")
+    work.add_argument("--unix", help="Connect to a Unix socket instead of TCP")
+    work.add_argument("--gpu", type=int, action="append", default=[], help="GPU index (repeatable)")
+    work.add_argument("--heartbeat", type=float, default=5.0)
+    work.add_argument("--reconnect-attempts", type=int, default=5, help="Failed connects before exiting")
+    work.add_argument("--handler", help="module:function job handler instead of the orchestrator")
+    work.add_argument("--work-dir", default=".", help="Where the orchestrator keeps learned batch sizes")
+
+    args = parser.parse_args()
+    asyncio.run(_run_coordinator(args) if args.role == "coordinator" else _run_worker(args))
+
+
+if __name__ == "__main__":
+    main()
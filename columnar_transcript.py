@@ -0,0 +1,444 @@
+"""
+columnar_transcript.py
+Compact columnar transcript representation with memory-mapped save/load.
+
+A multi-hour transcript as nested dicts (result["segments"][i]["words"][j])
+costs several Python objects per word. ColumnarTranscript stores the same
+data as two NumPy structured arrays (segments, words) whose text fields are
+byte offsets into one shared UTF-8 buffer. Times are integer milliseconds.
+
+Saved transcripts are a directory of .npy files plus a small JSON sidecar;
+loading maps them read-only without copying, and the JSON/SRT/VTT/text
+exporters stream from the arrays so nothing is materialized up front.
+"""
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+SEGMENT_DTYPE = np.dtype([
+    ('start_ms', np.int32),
+    ('end_ms', np.int32),
+    ('speaker', np.int16),       # index into ColumnarTranscript.speakers, -1 if unknown
+    ('confidence', np.float32),  # probability scale (exp(avg_logprob)); NaN if unknown
+    ('text_offset', np.int64),   # byte offset into the text buffer
+    ('text_len', np.int32),
+    ('word_start', np.int32),    # first row in the words array
+    ('word_count', np.int32),
+])
+
+WORD_DTYPE = np.dtype([
+    ('start_ms', np.int32),
+    ('end_ms', np.int32),
+    ('speaker', np.int16),
+    ('confidence', np.float32),
+    ('text_offset', np.int64),
+    ('text_len', np.int32),
+])
+
+META_FILE = 'transcript.json'
+
+# Grouping of word-level pipeline chunks into segments
+SENTENCE_END = ('.', '?', '!')
+SEGMENT_GAP_S = 1.0
+MAX_SEGMENT_S = 30.0
+
+
+def _ms(seconds) -> int:
+    return int(round(float(seconds or 0.0) * 1000))
+
+
+def _segment_confidence(seg: Dict) -> float:
+    """Probability-scale confidence; Whisper's avg_logprob is converted, NaN if absent."""
+    if seg.get("confidence") is not None:
+        return float(seg["confidence"])
+    if seg.get("avg_logprob") is not None:
+        return math.exp(seg["avg_logprob"])
+    return math.nan
+
+
+def _word_confidence(word: Dict) -> float:
+    for key in ("probability", "score"):
+        if word.get(key) is not None:
+            return float(word[key])
+    return math.nan
+
+
+def _optional(value) -> Optional[float]:
+    """NaN (no confidence recorded) exports as null."""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def segments_from_chunks(result: Dict) -> Dict:
+    """
+    Whisper-style ``{"text", "segments", "language"}`` from a transformers ASR
+    pipeline result ``{"text", "chunks": [{"text", "timestamp": (start, end)}]}``.
+
+    Word-level chunks are grouped into segments at sentence ends, pauses of
+    ``SEGMENT_GAP_S`` and every ``MAX_SEGMENT_S``. The pipeline reports no
+    per-word probabilities, so words carry none.
+    """
+    segments: List[Dict] = []
+    current: List[Dict] = []
+
+    def flush():
+        if current:
+            segments.append({
+                "start": current[0]["start"],
+                "end": current[-1]["end"],
+                "text": "".join(w["word"] for w in current),
+                "words": list(current),
+            })
+            current.clear()
+
+    for chunk in result.get("chunks") or []:
+        start, end = chunk.get("timestamp") or (None, None)
+        start = float(start or 0.0)
+        end = float(end) if end is not None else start  # the last chunk may be open-ended
+        if current and (start - current[-1]["end"] >= SEGMENT_GAP_S
+                        or end - current[0]["start"] > MAX_SEGMENT_S):
+            flush()
+        current.append({"word": chunk.get("text", ""), "start": start, "end": end})
+        if current[-1]["word"].rstrip().endswith(SENTENCE_END):
+            flush()
+    flush()
+
+    languages = [c["language"] for c in result.get("chunks") or [] if c.get("language")]
+    return {
+        "text": result.get("text", "".join(seg["text"] for seg in segments)).strip(),
+        "segments": segments,
+        "language": languages[0] if languages else result.get("language"),
+    }
+
+
+def _timestamp(ms: int, separator: str) -> str:
+    hours, rem = divmod(int(ms), 3_600_000)
+    minutes, rem = divmod(rem, 60_000)
+    seconds, millis = divmod(rem, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+
+class ColumnarTranscript:
+    """
+    Columnar transcript: segment and word tables over one UTF-8 text buffer.
+
+    Build one with ``from_dict`` (Whisper-style or orchestrator results) or
+    ``load`` (memory-mapped), and export with the ``iter_*``/``write_*`` methods.
+    """
+
+    def __init__(
+        self,
+        segments: np.ndarray,
+        words: np.ndarray,
+        text: np.ndarray,
+        speakers: Optional[List[str]] = None,
+        language: Optional[str] = None
+    ):
+        self.segments = segments
+        self.words = words
+        self.text = text  # uint8 buffer
+        self.speakers = speakers or []
+        self.language = language
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    @classmethod
+    def from_dict(cls, result: Dict) -> "ColumnarTranscript":
+        """
+        Convert a dict result into columns.
+
+        Accepts Whisper-style ``{"segments": [...]}`` results (segments may carry
+        ``words`` and ``speaker``), transformers pipeline ``{"chunks": [...]}``
+        results, and orchestrator results, whose transcript sits under
+        ``"transcription"``. Anything else raises ValueError rather than
+        producing an empty transcript.
+        """
+        if "segments" not in result and "transcription" in result:
+            result = result["transcription"]
+        if "segments" not in result:
+            if "chunks" not in result:
+                raise ValueError(
+                    f"Not a transcript result: expected 'segments' or 'chunks', got keys {sorted(result)}"
+                )
+            result = segments_from_chunks(result)
+        raw_segments = result["segments"]
+
+        speakers: List[str] = []
+        speaker_rows: Dict[str, int] = {}
+
+        def speaker_row(name) -> int:
+            if name is None:
+                return -1
+            if name not in speaker_rows:
+                speaker_rows[name] = len(speakers)
+                speakers.append(name)
+            return speaker_rows[name]
+
+        n_words = sum(len(seg.get("words") or []) for seg in raw_segments)
+        segments = np.zeros(len(raw_segments), dtype=SEGMENT_DTYPE)
+        words = np.zeros(n_words, dtype=WORD_DTYPE)
+        buffer = bytearray()
+
+        w = 0
+        for i, seg in enumerate(raw_segments):
+            encoded = seg.get("text", "").encode("utf-8")
+            seg_speaker = speaker_row(seg.get("speaker"))
+            seg_words = seg.get("words") or []
+            segments[i] = (
+                _ms(seg.get("start")), _ms(seg.get("end")), seg_speaker,
+                _segment_confidence(seg),
+                len(buffer), len(encoded), w, len(seg_words)
+            )
+            buffer += encoded
+            for word in seg_words:
+                encoded = word.get("word", word.get("text", "")).encode("utf-8")
+                word_speaker = speaker_row(word["speaker"]) if "speaker" in word else seg_speaker
+                words[w] = (
+                    _ms(word.get("start")), _ms(word.get("end")), word_speaker,
+                    _word_confidence(word),
+                    len(buffer), len(encoded)
+                )
+                buffer += encoded
+                w += 1
+
+        text = np.frombuffer(bytes(buffer), dtype=np.uint8)
+        return cls(segments, words, text, speakers, result.get("language"))
+
+    def save(self, path: str) -> None:
+        """Write the transcript as a directory of .npy arrays plus a JSON sidecar."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'segments.npy'), self.segments)
+        np.save(os.path.join(path, 'words.npy'), self.words)
+        np.save(os.path.join(path, 'text.npy'), self.text)
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'speakers': self.speakers, 'language': self.language}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ColumnarTranscript":
+        """Load a saved transcript; with ``mmap`` the arrays are mapped, not read."""
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(
+            np.load(os.path.join(path, 'segments.npy'), mmap_mode=mode),
+            np.load(os.path.join(path, 'words.npy'), mmap_mode=mode),
+            np.load(os.path.join(path, 'text.npy'), mmap_mode=mode),
+            meta.get('speakers', []),
+            meta.get('language')
+        )
+
+    def text_at(self, offset: int, length: int) -> str:
+        """Decode one slice of the shared text buffer."""
+        return self.text[offset:offset + length].tobytes().decode("utf-8")
+
+    def segment_text(self, i: int) -> str:
+        row = self.segments[i]
+        return self.text_at(row['text_offset'], row['text_len'])
+
+    def speaker_name(self, row: int) -> Optional[str]:
+        return self.speakers[row] if 0 <= row < len(self.speakers) else None
+
+    def iter_segments(self, block_rows: int = 4096) -> Iterator[Dict]:
+        """
+        Yield segments as dicts one at a time (words included).
+
+        Rows are converted ``block_rows`` segments at a time with ``tolist()``
+        and one bytes copy of the text they cover, since per-row NumPy scalar
+        access would dominate the export time.
+        """
+        for block_start in range(0, len(self.segments), block_rows):
+            seg_rows = self.segments[block_start:block_start + block_rows].tolist()
+            if not seg_rows:
+                continue
+            first_word = seg_rows[0][6]
+            last = seg_rows[-1]
+            word_rows = self.words[first_word:last[6] + last[7]].tolist()
+            text_start = seg_rows[0][4]
+            text_end = max(
+                [r[4] + r[5] for r in seg_rows] + [w[4] + w[5] for w in word_rows[-1:]]
+            )
+            buffer = self.text[text_start:text_end].tobytes()
+
+            def text(offset, length):
+                offset -= text_start
+                return buffer[offset:offset + length].decode("utf-8")
+
+            for start_ms, end_ms, speaker, conf, t_off, t_len, w_start, w_count in seg_rows:
+                w_first = w_start - first_word
+                yield {
+                    "start": start_ms / 1000,
+                    "end": end_ms / 1000,
+                    "speaker": self.speaker_name(speaker),
+                    "confidence": _optional(conf),
+                    "text": text(t_off, t_len),
+                    "words": [
+                        {
+                            "start": w[0] / 1000,
+                            "end": w[1] / 1000,
+                            "speaker": self.speaker_name(w[2]),
+                            "probability": _optional(w[3]),
+                            "word": text(w[4], w[5])
+                        }
+                        for w in word_rows[w_first:w_first + w_count]
+                    ]
+                }
+
+    def to_dict(self) -> Dict:
+        """Materialize the Whisper-style nested dict (the expensive form)."""
+        return {"segments": list(self.iter_segments()), "language": self.language}
+
+    def iter_json(self) -> Iterator[str]:
+        """Stream the dict form as JSON text without building it in memory."""
+        yield '{"language": ' + json.dumps(self.language) + ', "segments": ['
+        for i, seg in enumerate(self.iter_segments()):
+            yield (', ' if i else '') + json.dumps(seg, ensure_ascii=False)
+        yield ']}'
+
+    def iter_text(self) -> Iterator[str]:
+        """Plain text, one line per segment, prefixed with the speaker if known."""
+        for i, seg in enumerate(self.segments):
+            speaker = self.speaker_name(int(seg['speaker']))
+            line = self.segment_text(i).strip()
+            yield f"{speaker}: {line}\n" if speaker else f"{line}\n"
+
+    def iter_srt(self) -> Iterator[str]:
+        for i, seg in enumerate(self.segments):
+            yield (
+                f"{i + 1}\n"
+                f"{_timestamp(seg['start_ms'], ',')} --> {_timestamp(seg['end_ms'], ',')}\n"
+                f"{self._caption(i, seg)}\n\n"
+            )
+
+    def iter_vtt(self) -> Iterator[str]:
+        yield "WEBVTT\n\n"
+        for i, seg in enumerate(self.segments):
+            yield (
+                f"{_timestamp(seg['start_ms'], '.')} --> {_timestamp(seg['end_ms'], '.')}\n"
+                f"{self._caption(i, seg)}\n\n"
+            )
+
+    def write(self, path: str, fmt: Optional[str] = None) -> None:
+        """Stream an export to ``path``; format defaults to the file extension."""
+        fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+        exporters = {
+            'json': self.iter_json,
+            'txt': self.iter_text,
+            'srt': self.iter_srt,
+            'vtt': self.iter_vtt,
+        }
+        if fmt not in exporters:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(exporters[fmt]())
+
+    def _caption(self, i: int, seg) -> str:
+        speaker = self.speaker_name(int(seg['speaker']))
+        line = self.segment_text(i).strip()
+        return f"[{speaker}] {line}" if speaker else line
+
+
+def _synthetic_result(n_segments: int, words_per_segment: int = 12) -> Dict:
+    segments = []
+    t = 0.0
+    for i in range(n_segments):
+        words = []
+        for j in range(words_per_segment):
+            words.append({"start": t, "end": t + 0.25, "word": f" word{j}", "probability": 0.9})
+            t += 0.3
+        segments.append({
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": "".join(w["word"] for w in words),
+            "speaker": f"SPEAKER_{i % 3:02d}",
+            "words": words
+        })
+    return {"segments": segments, "language": "en"}
+
+
+def _load_json(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process (file-backed mmap pages included)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import psutil
+        return psutil.Process().memory_info().rss
+
+
+def _measure(form: str, json_path: str, columnar_path: str) -> Dict:
+    """Run in a fresh process: load one form, then make a full JSON export pass over it."""
+    baseline = _rss_bytes()
+    started = time.perf_counter()
+    if form == 'dict':
+        loaded = _load_json(json_path)
+    else:
+        loaded = ColumnarTranscript.load(columnar_path, mmap=(form == 'columnar_mmap'))
+    load_seconds = time.perf_counter() - started
+    rss_after_load = _rss_bytes() - baseline
+
+    started = time.perf_counter()
+    if form == 'dict':
+        exported = sum(len(json.dumps(seg, ensure_ascii=False)) for seg in loaded['segments'])
+    else:
+        exported = sum(len(chunk) for chunk in loaded.iter_json())
+    pass_seconds = time.perf_counter() - started
+    report = {
+        'load_seconds': load_seconds,
+        'pass_seconds': pass_seconds,
+        'rss_after_load_mb': rss_after_load / 1024 ** 2,
+        'rss_after_pass_mb': (_rss_bytes() - baseline) / 1024 ** 2,
+        'exported_chars': exported,
+    }
+    if form != 'dict':
+        nbytes = loaded.segments.nbytes + loaded.words.nbytes + loaded.text.nbytes
+        report['array_mb'] = nbytes / 1024 ** 2
+    return report
+
+
+def benchmark(n_segments: int = 50_000, workdir: Optional[str] = None) -> Dict:
+    """
+    Compare the dict form (JSON) against the columnar form, memory-mapped and
+    fully in memory, for a synthetic transcript.
+
+    Each form is measured in its own fresh process: RSS growth right after load
+    (mmap pages are not resident until touched) and after a full JSON export
+    pass that touches every row.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='transcript_benchmark_')
+    result = _synthetic_result(n_segments)
+    json_path = os.path.join(workdir, 'transcript.json')
+    columnar_path = os.path.join(workdir, 'columnar')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    ColumnarTranscript.from_dict(result).save(columnar_path)
+    del result
+
+    report = {}
+    for form in ('dict', 'columnar_memory', 'columnar_mmap'):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            report[form] = pool.submit(_measure, form, json_path, columnar_path).result()
+    return report
+
+
+if __name__ == "__main__":
+    for form, stats in benchmark().items():
+        print(
+            f"{form:>15}: load {stats['load_seconds'] * 1000:8.1f} ms"
+            f" | RSS after load {stats['rss_after_load_mb']:7.1f} MB"
+            f" | full pass {stats['pass_seconds'] * 1000:8.1f} ms"
+            f" | RSS after pass {stats['rss_after_pass_mb']:7.1f} MB"
+            + (f" | arrays {stats['array_mb']:6.1f} MB" if 'array_mb' in stats else "")
+        )
@@ -0,0 +1,300 @@
+"""
+cpu_backend.py
+CPU execution backend for the multi-engine orchestrator.
+
+Runs CTranslate2 (faster-whisper) int8/fp32 model variants and shards a file's
+audio across a process pool sized to the physical cores. Shards overlap; each
+word is kept only by the shard that owns its midpoint, so words crossing a cut
+are neither lost nor duplicated. Each worker is pinned
+to a fixed number of BLAS/OpenMP threads so workers x threads never exceeds the
+machine, instead of every process grabbing every core.
+"""
+import asyncio
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+SAMPLE_RATE = 16000
+
+# CPU performance profiles keyed by TranscriptionEngine value.
+# rtfx_per_core is measured with one int8 worker at 1 thread; fp32 runs ~2x slower.
+CPU_ENGINE_PROFILES = {
+    "whisper_large_v3_turbo": {
+        "model": "large-v3-turbo",
+        "rtfx_per_core": 1.6,
+        "fp32_slowdown": 2.0,
+        "wer": 0.115,
+    },
+    "distil_whisper_large_v3": {
+        "model": "distil-large-v3",
+        "rtfx_per_core": 3.2,
+        "fp32_slowdown": 2.0,
+        "wer": 0.125,
+    },
+}
+
+# Environment variables honoured by the BLAS/OpenMP runtimes used under the hood
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# Per-process model cache so each worker loads its model once
+_worker_models: Dict[Tuple[str, str], object] = {}
+_worker_threads = 1
+
+
+def physical_core_count() -> int:
+    """Number of physical cores (hyperthreads excluded when psutil is available)."""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    return cores or os.cpu_count() or 1
+
+
+def supports_int8() -> bool:
+    """True if the installed CTranslate2 build has an int8 CPU kernel."""
+    try:
+        import ctranslate2
+    except ImportError:
+        return False
+    return "int8" in ctranslate2.get_supported_compute_types("cpu")
+
+
+def _init_worker(threads: int) -> None:
+    """
+    Pool initializer: cap intra-op threads before any heavy library loads.
+
+    CTranslate2 takes its count from ``cpu_threads`` and BLAS/OpenMP from the
+    environment, so torch is never imported here; it is only capped if
+    something already loaded it.
+    """
+    global _worker_threads
+    _worker_threads = threads
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            torch.set_num_threads(threads)
+            torch.set_num_interop_threads(1)
+        except RuntimeError:  # interop threads can only be set once
+            pass
+
+
+def _keep_owned(segments: List[Dict], owned_start: float, owned_end: Optional[float]) -> List[Dict]:
+    """
+    Trim absolute-time segments to the words whose midpoint lies in
+    [owned_start, owned_end); segments are rebuilt from the surviving words.
+    """
+    def owned(start: float, end: float) -> bool:
+        mid = (start + end) / 2
+        return mid >= owned_start and (owned_end is None or mid < owned_end)
+
+    kept = []
+    for seg in segments:
+        if not seg["words"]:
+            if owned(seg["start"], seg["end"]):
+                kept.append(seg)
+            continue
+        words = [w for w in seg["words"] if owned(w["start"], w["end"])]
+        if not words:
+            continue
+        if len(words) < len(seg["words"]):
+            seg = dict(
+                seg,
+                start=words[0]["start"],
+                end=words[-1]["end"],
+                text="".join(w["word"] for w in words),
+                words=words
+            )
+        kept.append(seg)
+    return kept
+
+
+def _transcribe_shard(
+    file_path: str,
+    model_name: str,
+    compute_type: str,
+    start: float,
+    duration: Optional[float],
+    owned_start: float = 0.0,
+    owned_end: Optional[float] = None
+) -> List[Dict]:
+    """
+    Worker entry point: transcribe one (overlapping) time slice and return the
+    absolute-time segments this shard owns.
+    """
+    import librosa
+    from faster_whisper import WhisperModel
+
+    key = (model_name, compute_type)
+    model = _worker_models.get(key)
+    if model is None:
+        model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=_worker_threads,
+            num_workers=1
+        )
+        _worker_models[key] = model
+
+    audio, _ = librosa.load(file_path, sr=SAMPLE_RATE, offset=start, duration=duration)
+    segments, _info = model.transcribe(audio, word_timestamps=True, vad_filter=True)
+
+    results = []
+    for seg in segments:
+        results.append({
+            "start": seg.start + start,
+            "end": seg.end + start,
+            "text": seg.text,
+            "words": [
+                {
+                    "start": w.start + start,
+                    "end": w.end + start,
+                    "word": w.word,
+                    "probability": w.probability
+                }
+                for w in (seg.words or [])
+            ]
+        })
+    return _keep_owned(results, owned_start, owned_end)
+
+
+class CPUBackend:
+    """
+    Core-aware CPU transcription backend.
+
+    Args:
+        num_workers: Worker processes (defaults to physical cores // threads_per_worker).
+        threads_per_worker: BLAS/OpenMP threads per worker.
+        shard_seconds: Granularity of shard lengths; shards own whole multiples of it.
+        overlap_seconds: Audio decoded past each side of a cut. Must exceed the
+            longest word so every word is seen whole by the shard that owns it.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        threads_per_worker: int = 2,
+        shard_seconds: float = 30.0,
+        overlap_seconds: float = 5.0
+    ):
+        cores = physical_core_count()
+        self.threads_per_worker = max(1, min(threads_per_worker, cores))
+        self.num_workers = num_workers or max(1, cores // self.threads_per_worker)
+        self.shard_seconds = shard_seconds
+        self.overlap_seconds = overlap_seconds
+        self.int8_available = supports_int8()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Lazily started spawn-context pool (fork would inherit parent thread pools)."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.threads_per_worker,)
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def compute_type(self, quality_tier: str = "standard") -> str:
+        """int8 for throughput; fp32 for critical work or when int8 is unavailable."""
+        if quality_tier == "critical" or not self.int8_available:
+            return "float32"
+        return "int8"
+
+    def profile(self, engine_value: str, quality_tier: str = "standard") -> Optional[Dict]:
+        """
+        Node-level performance profile for an engine, or None if it has no CPU variant.
+
+        RTFx scales with the worker count since shards run fully in parallel.
+        """
+        base = CPU_ENGINE_PROFILES.get(engine_value)
+        if base is None:
+            return None
+        compute_type = self.compute_type(quality_tier)
+        rtfx = base["rtfx_per_core"] * self.num_workers * self.threads_per_worker
+        if compute_type == "float32":
+            rtfx /= base["fp32_slowdown"]
+        return {
+            "model": base["model"],
+            "compute_type": compute_type,
+            "rtfx": rtfx,
+            "wer": base["wer"],
+            "gpu_memory_gb": 0,
+        }
+
+    def plan_shards(self, duration: float) -> List[Tuple[float, Optional[float]]]:
+        """
+        Split ``duration`` into at most ``num_workers`` owned (start, length) shards.
+
+        An unknown duration (<= 0) yields one shard covering the whole file.
+        """
+        if duration <= 0:
+            return [(0.0, None)]
+        windows = math.ceil(duration / self.shard_seconds)
+        per_shard = math.ceil(windows / min(windows, self.num_workers)) * self.shard_seconds
+        shards = []
+        start = 0.0
+        while start < duration:
+            shards.append((start, min(per_shard, duration - start)))
+            start += per_shard
+        return shards
+
+    async def transcribe(
+        self,
+        file_path: str,
+        engine_value: str,
+        duration: float,
+        compute_type: Optional[str] = None
+    ) -> Dict:
+        """Transcribe ``file_path`` across the pool and stitch segments back in order."""
+        base = CPU_ENGINE_PROFILES.get(engine_value)
+        if base is None:
+            raise ValueError(f"Engine {engine_value} has no CPU variant")
+        compute_type = compute_type or self.compute_type()
+
+        shards = self.plan_shards(duration)
+        loop = asyncio.get_running_loop()
+        futures = []
+        for i, (start, length) in enumerate(shards):
+            first, last = i == 0, i == len(shards) - 1
+            window_start = start if first else start - self.overlap_seconds
+            window_length = None if last else (start + length + self.overlap_seconds) - window_start
+            futures.append(loop.run_in_executor(
+                self.pool,
+                _transcribe_shard,
+                file_path,
+                base["model"],
+                compute_type,
+                window_start,
+                window_length,
+                start,
+                None if last else start + length
+            ))
+        shard_results = await asyncio.gather(*futures)
+
+        segments = [seg for shard in shard_results for seg in shard]
+        return {
+            "text": "".join(seg["text"] for seg in segments).strip(),
+            "segments": segments,
+            "device": "cpu",
+            "compute_type": compute_type,
+        }
@@ -2,31 +2,120 @@
 case_router.py
 Moves processed files from processing/ to the correct case folder in cases/.
 Auto-creates case folders and organizes by type (audio, transcripts, spectral, analysis).
+
+Batches are routed in two passes: files already on the same filesystem as cases/
+are moved with a plain rename, and cross-device files are copied in a bounded
+thread pool. Created directories are cached so each is made once per router;
+a cached folder that has since been removed is recreated on the first ENOENT.
+
+Existing evidence is never overwritten: a file whose destination already exists,
+or is claimed by an earlier file in the same batch, is left in place and reported
+as a conflict.
 """
+import errno
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 CASES_DIR = 'cases'
 
 class CaseRouter:
-    def __init__(self):
-        pass
+    def __init__(self, cases_dir=CASES_DIR, max_workers=8):
+        self.cases_dir = cases_dir
+        self.max_workers = max_workers
+        self._created_dirs = set()
+        self._dir_devices = {}
 
     def route_file(self, fname, case_id, file_type):
         """Move file to /cases/{case_id}/{file_type}/, auto-create folders."""
-        dest_dir = os.path.join(CASES_DIR, case_id, file_type)
-        os.makedirs(dest_dir, exist_ok=True)
-        shutil.move(fname, os.path.join(dest_dir, os.path.basename(fname)))
+        dest_dir = self._dest_dir(case_id, file_type)
+        dest = os.path.join(dest_dir, os.path.basename(fname))
+        if os.path.lexists(dest):
+            raise FileExistsError(errno.EEXIST, "Destination already exists", dest)
+        self._retry_missing_dir(shutil.move, fname, dest)
         print(f"Moved {fname} to {dest_dir}")
 
     def route_batch(self, files, case_id_map):
-        """Route a batch of files using a mapping of filename to (case_id, file_type)."""
-        for fname in files:
+        """
+        Route a batch of files using a mapping of filename to (case_id, file_type).
+
+        Returns one report dict per input file, in input order:
+        {'file', 'dest', 'status': 'renamed' | 'copied' | 'conflict' | 'error', 'error'}.
+        A 'conflict' file was left where it was because its destination already
+        exists or an earlier file in the batch is going there.
+        """
+        reports = [None] * len(files)
+        cross_device = []
+        claimed = set()
+        os.makedirs(self.cases_dir, exist_ok=True)  # once per batch, in case it was removed
+        cases_dev = os.stat(self.cases_dir).st_dev
+
+        for i, fname in enumerate(files):
             case_id, file_type = case_id_map.get(fname, ("unknown_case", "misc"))
-            self.route_file(fname, case_id, file_type)
+            report = {'file': fname, 'dest': None, 'status': 'error', 'error': None}
+            reports[i] = report
+            try:
+                dest = os.path.join(self._dest_dir(case_id, file_type), os.path.basename(fname))
+                report['dest'] = dest
+                if dest in claimed or os.path.lexists(dest):
+                    report['status'] = 'conflict'
+                    report['error'] = f"destination already {'claimed in this batch' if dest in claimed else 'exists'}"
+                    continue
+                claimed.add(dest)
+                if self._device(os.path.dirname(os.path.abspath(fname))) == cases_dev:
+                    self._retry_missing_dir(os.replace, fname, dest)
+                    report['status'] = 'renamed'
+                else:
+                    cross_device.append((report, fname, dest))
+            except OSError as e:
+                if e.errno == errno.EXDEV and report['dest']:
+                    cross_device.append((report, fname, report['dest']))  # e.g. bind mounts
+                else:
+                    report['error'] = str(e)
+
+        if cross_device:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(lambda job: self._copy_across(*job), cross_device))
+        return reports
+
+    def _copy_across(self, report, fname, dest):
+        try:
+            self._retry_missing_dir(shutil.move, fname, dest)  # copy + unlink across filesystems
+            report['status'] = 'copied'
+        except OSError as e:
+            report['error'] = str(e)
+
+    def _retry_missing_dir(self, move, fname, dest):
+        """Run ``move``, recreating the destination folder once if it was removed since it was cached."""
+        try:
+            move(fname, dest)
+        except FileNotFoundError:
+            dest_dir = os.path.dirname(dest)
+            if os.path.isdir(dest_dir) or not os.path.lexists(fname):
+                raise  # the source is what is missing
+            self._created_dirs.discard(dest_dir)
+            self._ensure_dir(dest_dir)
+            move(fname, dest)
+
+    def _dest_dir(self, case_id, file_type):
+        return self._ensure_dir(os.path.join(self.cases_dir, case_id, file_type))
+
+    def _ensure_dir(self, path):
+        if path not in self._created_dirs:
+            os.makedirs(path, exist_ok=True)
+            self._created_dirs.add(path)
+        return path
+
+    def _device(self, dirpath):
+        """st_dev of a directory, cached since a batch usually shares a few source dirs."""
+        dev = self._dir_devices.get(dirpath)
+        if dev is None:
+            dev = self._dir_devices[dirpath] = os.stat(dirpath).st_dev
+        return dev
 
 if __name__ == "__main__":
     os.makedirs(CASES_DIR, exist_ok=True)
     # Example usage:
     # router = CaseRouter()
     # router.route_file('example.wav', 'case_001', 'audio')
+    # report = router.route_batch(['a.wav', 'b.txt'], {'a.wav': ('case_001', 'audio')})
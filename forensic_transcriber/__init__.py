@@ -10,14 +10,33 @@ __version__ = "0.1.0"
 __author__ = "Casey C. (GlacierEQ)"
 __license__ = "MIT"
 
-# Import core functionality
-from .core.processor import process_media  # noqa: F401
-from .core.scanner import scan_directory  # noqa: F401
-from .models.case import Case  # noqa: F401
-
-# Set up logging
+import importlib
 import logging
 
+# Core functionality is imported lazily on first attribute access (PEP 562), so
+# `import forensic_transcriber` stays fast and does not fail when an optional
+# submodule or its heavy dependencies are missing.
+_LAZY_ATTRS = {
+    "process_media": ".core.processor",
+    "scan_directory": ".core.scanner",
+    "Case": ".models.case",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
+
+
+# Set up logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -4,16 +4,25 @@ GlacierEQ/whisperX - ASTRONOMICAL POWER Multi-Engine Orchestrator
 Intelligent routing across 4 transcription + 3 diarization engines
 
 Performance: 216-418x realtime | Accuracy: 5.63-12% WER | Memory: < 4GB GPU
+
+Heavy dependencies (torch, librosa, numpy and every engine backend) are imported
+on first use, so importing this module stays cheap; see benchmark_imports.py.
 """
-import torch
 import asyncio
-from typing import Dict, List, Optional, Literal, Tuple
+import importlib.util
+import shutil
+from typing import TYPE_CHECKING, Dict, List, Optional, Literal, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import hashlib
+import os
 import json
-import librosa
-import numpy as np
+
+from batch_autotuner import BatchAutotuner
+from cpu_backend import CPUBackend
+
+if TYPE_CHECKING:
+    from speaker_index import SpeakerIndex
 
 class TranscriptionEngine(Enum):
     """Available transcription engines with capabilities"""
@@ -28,6 +37,76 @@ class DiarizationEngine(Enum):
     SORTFORMER = "nvidia_sortformer_streaming" # 0.32-30s latency modes
     PYANNOTE_V3 = "pyannote_audio_v3.1"       # 8-12% DER, production standard
 
+class EngineUnavailableError(RuntimeError):
+    """Raised at routing time when no engine for a task has its backend installed"""
+
+# Python modules each engine needs. Checked with importlib.util.find_spec, so
+# routing knows what is installed without importing any of it.
+ENGINE_REQUIREMENTS = {
+    TranscriptionEngine.WHISPER_TURBO: ("transformers", "torch"),
+    TranscriptionEngine.CANARY_QWEN: ("nemo",),
+    TranscriptionEngine.KYUTAI_STREAMING: ("moshi",),
+    TranscriptionEngine.DISTIL_WHISPER: ("transformers", "torch"),
+    DiarizationEngine.FALCON: ("pvfalcon",),
+    DiarizationEngine.SORTFORMER: ("nemo",),
+    DiarizationEngine.PYANNOTE_V3: ("pyannote.audio",),
+}
+
+# Learned batch sizes, kept in the orchestrator's work_dir across restarts
+AUTOTUNE_STATE_FILE = ".batch_autotune.json"
+
+# Engines with a real batched decode path; only these are autotuned
+BATCHED_ENGINES = {
+    TranscriptionEngine.WHISPER_TURBO,
+    TranscriptionEngine.DISTIL_WHISPER,
+}
+
+# CPU nodes run every transcription engine through cpu_backend (faster-whisper)
+CPU_TRANSCRIPTION_REQUIREMENTS = ("faster_whisper", "librosa")
+
+# Preferred engine first, then what routing falls back to if it is unavailable
+ENGINE_FALLBACKS = {
+    TranscriptionEngine.CANARY_QWEN: [
+        TranscriptionEngine.CANARY_QWEN,
+        TranscriptionEngine.WHISPER_TURBO,
+        TranscriptionEngine.DISTIL_WHISPER,
+    ],
+    TranscriptionEngine.KYUTAI_STREAMING: [
+        TranscriptionEngine.KYUTAI_STREAMING,
+        TranscriptionEngine.DISTIL_WHISPER,
+        TranscriptionEngine.WHISPER_TURBO,
+    ],
+    TranscriptionEngine.WHISPER_TURBO: [
+        TranscriptionEngine.WHISPER_TURBO,
+        TranscriptionEngine.DISTIL_WHISPER,
+    ],
+    TranscriptionEngine.DISTIL_WHISPER: [
+        TranscriptionEngine.DISTIL_WHISPER,
+        TranscriptionEngine.WHISPER_TURBO,
+    ],
+    DiarizationEngine.FALCON: [
+        DiarizationEngine.FALCON,
+        DiarizationEngine.PYANNOTE_V3,
+    ],
+    DiarizationEngine.SORTFORMER: [
+        DiarizationEngine.SORTFORMER,
+        DiarizationEngine.PYANNOTE_V3,
+        DiarizationEngine.FALCON,
+    ],
+    DiarizationEngine.PYANNOTE_V3: [
+        DiarizationEngine.PYANNOTE_V3,
+        DiarizationEngine.SORTFORMER,
+        DiarizationEngine.FALCON,
+    ],
+}
+
+def module_available(name: str) -> bool:
+    """True if ``name`` can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
 @dataclass
 class AudioProfile:
     """Audio characteristics for intelligent routing"""
@@ -50,6 +129,8 @@ class ProcessingConfig:
     priority: int
     expected_rtfx: float
     expected_wer: float
+    device: str = "cuda"
+    compute_type: str = "float16"
 
 class AstronomicalOrchestrator:
     """
@@ -62,14 +143,37 @@ class AstronomicalOrchestrator:
     Features:
     - Automatic audio profiling (noise, language, speaker count)
     - Intelligent engine selection with configurable policies
-    - Dynamic batch sizing based on GPU memory
+    - Dynamic batch sizing based on GPU memory (autotuned, with OOM backoff)
     - Performance estimation and SLA routing
     """
     
-    def __init__(self, gpu_devices: List[int] = [0]):
+    def __init__(
+        self,
+        gpu_devices: List[int] = [0],
+        autotuner: Optional[BatchAutotuner] = None,
+        cpu_backend: Optional[CPUBackend] = None,
+        device: Optional[str] = None,
+        work_dir: str = "."
+    ):
+        """
+        Args:
+            gpu_devices: GPU indices to use; the first visible one is picked
+            autotuner: Shared batch size autotuner (by default one persisted
+                to AUTOTUNE_STATE_FILE in work_dir)
+            cpu_backend: CPU backend to use when running on cpu
+            device: "cpu" or "cuda:N" to skip detection (and the torch import)
+            work_dir: Directory for the orchestrator's state files
+        """
         self.gpu_devices = gpu_devices
-        self.engines = {}
+        self.engines = {}  # loaded models, filled on first use by _load_engine
         self.performance_cache = {}
+        self._device = device  # resolved on first use, see the device property
+        self.autotuner = autotuner or BatchAutotuner(
+            state_path=os.path.join(work_dir, AUTOTUNE_STATE_FILE)
+        )
+        self._cpu_backend = cpu_backend
+        self.speaker_indexes: Dict[str, "SpeakerIndex"] = {}
+        self._availability: Dict[Enum, bool] = {}
         
         # Performance profiles (RTFx = realtime factor)
         self.engine_profiles = {
@@ -78,7 +182,9 @@ class AstronomicalOrchestrator:
                 "wer": 0.11,
                 "gpu_memory_gb": 4,
                 "languages": 99,
-                "streaming": False
+                "streaming": False,
+                "model": "openai/whisper-large-v3-turbo",
+                "chunk_length_s": 30
             },
             TranscriptionEngine.CANARY_QWEN: {
                 "rtfx": 418,
@@ -99,7 +205,9 @@ class AstronomicalOrchestrator:
                 "wer": 0.12,
                 "gpu_memory_gb": 2,
                 "languages": 99,
-                "streaming": False
+                "streaming": False,
+                "model": "distil-whisper/distil-large-v3",
+                "chunk_length_s": 25
             }
         }
         
@@ -136,6 +244,9 @@ class AstronomicalOrchestrator:
         Returns:
             AudioProfile with metadata for engine selection
         """
+        import librosa
+        import numpy as np
+        
         # Load audio metadata (fast)
         duration = librosa.get_duration(path=file_path)
         y, sr = librosa.load(file_path, sr=None, duration=5.0)  # Sample first 5s
@@ -170,6 +281,7 @@ class AstronomicalOrchestrator:
         - Standard/Clean -> Whisper Turbo (optimal speed-accuracy)
         - Streaming -> Kyutai + Sortformer (low latency)
         - Edge/Mobile -> Distil-Whisper + Falcon (resource efficient)
+        - CPU nodes -> see _select_cpu_engines
         
         Args:
             profile: AudioProfile from audio analysis
@@ -178,7 +290,15 @@ class AstronomicalOrchestrator:
             ProcessingConfig with optimal engine selections
         """
         
+        if self.device == "cpu":
+            return self._select_cpu_engines(profile)
+        
+        # Engines whose backend is not installed are skipped in favour of their
+        # fallbacks; EngineUnavailableError if nothing for the task is usable.
+        
         # Transcription engine selection
+        # Batch sizes here are only first guesses; the autotuner refines them
+        # per (engine, device, chunk length) from observed successes and OOMs.
         if profile.quality_tier == "critical" or profile.is_noisy:
             transcription = TranscriptionEngine.CANARY_QWEN
             batch_size = 8
@@ -195,6 +315,16 @@ class AstronomicalOrchestrator:
             transcription = TranscriptionEngine.WHISPER_TURBO
             batch_size = 12
         
+        transcription = self._first_available(transcription)
+        
+        if transcription in BATCHED_ENGINES:
+            batch_size = self.autotuner.suggest(
+                transcription,
+                self.device,
+                self.engine_profiles[transcription]["chunk_length_s"],
+                default=batch_size
+            )
+        
         # Diarization engine selection
         if profile.requires_streaming:
             diarization = DiarizationEngine.SORTFORMER
@@ -205,6 +335,8 @@ class AstronomicalOrchestrator:
         else:
             diarization = DiarizationEngine.PYANNOTE_V3
         
+        diarization = self._first_available(diarization)
+        
         # GPU memory calculation
         trans_memory = self.engine_profiles[transcription]["gpu_memory_gb"]
         diar_memory = self.diarization_profiles.get(
@@ -224,13 +356,56 @@ class AstronomicalOrchestrator:
             gpu_memory_limit=total_memory,
             priority=1 if profile.quality_tier == "critical" else 5,
             expected_rtfx=expected_rtfx,
-            expected_wer=expected_wer
+            expected_wer=expected_wer,
+            device=self.device,
+            compute_type="float16"
+        )
+    
+    def _select_cpu_engines(self, profile: AudioProfile) -> ProcessingConfig:
+        """
+        Engine selection for CPU-only nodes.
+        
+        Only engines with a CTranslate2 CPU variant are eligible:
+        - Critical/Noisy -> Whisper Turbo fp32 (accuracy over speed)
+        - Streaming -> Distil-Whisper int8 (lowest latency on CPU)
+        - Everything else -> Whisper Turbo int8
+        Diarization prefers Falcon, which is built for on-device CPU use.
+        """
+        missing = [m for m in CPU_TRANSCRIPTION_REQUIREMENTS if not module_available(m)]
+        if missing:
+            raise EngineUnavailableError(
+                f"No transcription engine available on cpu: install {', '.join(missing)}"
+            )
+        
+        if profile.requires_streaming:
+            transcription = TranscriptionEngine.DISTIL_WHISPER
+        else:
+            transcription = TranscriptionEngine.WHISPER_TURBO
+        
+        critical = profile.quality_tier == "critical" or profile.is_noisy
+        cpu_profile = self.cpu_backend.profile(
+            transcription.value,
+            "critical" if critical else profile.quality_tier
+        )
+        
+        return ProcessingConfig(
+            transcription_engine=transcription,
+            diarization_engine=self._first_available(DiarizationEngine.FALCON),
+            batch_size=1,
+            use_vad=True,
+            gpu_memory_limit=0,
+            priority=1 if profile.quality_tier == "critical" else 5,
+            expected_rtfx=cpu_profile["rtfx"],
+            expected_wer=cpu_profile["wer"],
+            device="cpu",
+            compute_type=cpu_profile["compute_type"]
         )
     
     async def process_astronomical(
         self, 
         file_path: str,
-        config: Optional[ProcessingConfig] = None
+        config: Optional[ProcessingConfig] = None,
+        case_id: Optional[str] = None
     ) -> Dict:
         """
         Process audio with astronomical optimization.
@@ -239,6 +414,7 @@ class AstronomicalOrchestrator:
         Args:
             file_path: Path to audio file
             config: Optional processing configuration (auto-generated if None)
+            case_id: Optional case; speakers are labelled with case-wide ids
             
         Returns:
             Dict with transcription, diarization, and metadata
@@ -250,22 +426,43 @@ class AstronomicalOrchestrator:
             config = self.select_optimal_engines(profile)
         
         print(f"🚀 ASTRONOMICAL PROCESSING")
-        print(f"   Engine: {config.transcription_engine.value}")
+        print(f"   Engine: {config.transcription_engine.value} ({config.device}, {config.compute_type})")
         print(f"   Expected RTFx: {config.expected_rtfx}x realtime")
         print(f"   Expected WER: {config.expected_wer*100:.2f}%")
         print(f"   Diarization: {config.diarization_engine.value}")
         
-        # Load appropriate engine
-        transcription_result = await self._run_transcription(
-            file_path, 
-            config.transcription_engine,
-            config.batch_size
-        )
+        # Load appropriate engine; OOMs back off to a smaller batch and retry
+        if config.device == "cpu":
+            transcription_result = await self.cpu_backend.transcribe(
+                file_path,
+                config.transcription_engine.value,
+                self._audio_duration(file_path),
+                config.compute_type
+            )
+        elif config.transcription_engine not in BATCHED_ENGINES:
+            transcription_result = await self._run_transcription(
+                file_path,
+                config.transcription_engine,
+                config.batch_size
+            )
+        else:
+            transcription_result = await self.autotuner.run(
+                config.transcription_engine,
+                self.device,
+                self.engine_profiles[config.transcription_engine]["chunk_length_s"],
+                config.batch_size,
+                lambda batch_size: self._run_transcription(
+                    file_path,
+                    config.transcription_engine,
+                    batch_size
+                )
+            )
         
         # Run diarization
         diarization_result = await self._run_diarization(
             file_path,
-            config.diarization_engine
+            config.diarization_engine,
+            case_id
         )
         
         # Merge results
@@ -276,23 +473,124 @@ class AstronomicalOrchestrator:
         
         return final_result
     
+    @property
+    def device(self) -> str:
+        """Execution device, detected the first time routing or processing needs it"""
+        if self._device is None:
+            self._device = self._detect_device(self.gpu_devices)
+        return self._device
+    
+    @property
+    def cpu_backend(self) -> CPUBackend:
+        """CPU backend, created on first CPU job"""
+        if self._cpu_backend is None:
+            self._cpu_backend = CPUBackend()
+        return self._cpu_backend
+    
+    def _detect_device(self, gpu_devices: List[int]) -> str:
+        """
+        First requested GPU if torch can see one, else cpu.
+        
+        torch is only imported when an NVIDIA driver is present, so CPU-only
+        nodes never pay for it even when it is installed.
+        """
+        if not gpu_devices or not module_available("torch"):
+            return "cpu"
+        has_driver = (
+            os.path.exists("/proc/driver/nvidia/version")
+            or shutil.which("nvidia-smi") is not None
+        )
+        if not has_driver:
+            return "cpu"
+        import torch
+        return f"cuda:{gpu_devices[0]}" if torch.cuda.is_available() else "cpu"
+    
+    def engine_available(self, engine: Enum) -> bool:
+        """True if every module the engine needs is installed (cached)"""
+        if engine not in self._availability:
+            self._availability[engine] = all(
+                module_available(name) for name in ENGINE_REQUIREMENTS[engine]
+            )
+        return self._availability[engine]
+    
+    def _first_available(self, preferred: Enum) -> Enum:
+        """Preferred engine if installed, else its first installed fallback"""
+        for engine in ENGINE_FALLBACKS[preferred]:
+            if self.engine_available(engine):
+                if engine != preferred:
+                    print(f"⚠️  Engine unavailable: {preferred.value}, falling back to {engine.value}")
+                return engine
+        needed = sorted({
+            name for engine in ENGINE_FALLBACKS[preferred]
+            for name in ENGINE_REQUIREMENTS[engine]
+        })
+        raise EngineUnavailableError(
+            f"Engine unavailable: {preferred.value} and all fallbacks "
+            f"(install one of: {', '.join(needed)})"
+        )
+    
+    def _load_engine(self, engine: Enum):
+        """Import and construct an engine's model on first use, then reuse it"""
+        if engine in self.engines:
+            return self.engines[engine]
+        
+        if engine in BATCHED_ENGINES:
+            import torch
+            from transformers import pipeline
+            model = pipeline(
+                "automatic-speech-recognition",
+                model=self.engine_profiles[engine]["model"],
+                torch_dtype=torch.float16 if self.device.startswith("cuda") else torch.float32,
+                device=self.device
+            )
+            
+        elif engine == DiarizationEngine.PYANNOTE_V3:
+            from pyannote.audio import Pipeline
+            model = Pipeline.from_pretrained(
+                "pyannote/speaker-diarization-3.1",
+                use_auth_token="YOUR_HF_TOKEN"  # Replace with your token
+            )
+            
+        else:
+            model = None  # placeholder engines have nothing to load yet
+        
+        self.engines[engine] = model
+        return model
+    
+    def _audio_duration(self, file_path: str) -> float:
+        """Audio duration in seconds, 0.0 if it cannot be read"""
+        try:
+            import librosa
+            return librosa.get_duration(path=file_path)
+        except Exception:
+            return 0.0
+    
     async def _run_transcription(
         self, 
         file_path: str, 
         engine: TranscriptionEngine,
         batch_size: int
     ) -> Dict:
-        """Execute transcription with selected engine"""
+        """
+        Execute transcription with selected engine.
         
-        if engine == TranscriptionEngine.WHISPER_TURBO:
-            import whisper
-            model = whisper.load_model("turbo", device="cuda")
-            result = model.transcribe(
+        Whisper-family engines decode chunk_length_s windows, batch_size of them
+        per forward pass, so batch_size directly sets peak activation memory.
+        Every engine returns ``{"text", "segments", "language"}``.
+        """
+        
+        if engine in BATCHED_ENGINES:
+            from columnar_transcript import segments_from_chunks
+            pipe = self._load_engine(engine)
+            output = pipe(
                 file_path,
-                fp16=True,
-                language=None,
-                word_timestamps=True
+                chunk_length_s=self.engine_profiles[engine]["chunk_length_s"],
+                batch_size=batch_size,
+                return_timestamps="word",
+                return_language=True
             )
+            # Same segments/words/language shape as the CPU backend and Whisper
+            result = segments_from_chunks(output)
             
         elif engine == TranscriptionEngine.CANARY_QWEN:
             # NVIDIA Canary Qwen implementation (requires NeMo)
@@ -301,24 +599,29 @@ class AstronomicalOrchestrator:
         elif engine == TranscriptionEngine.KYUTAI_STREAMING:
             # Kyutai streaming implementation
             result = {"text": "Kyutai streaming placeholder", "segments": []}
-            
-        elif engine == TranscriptionEngine.DISTIL_WHISPER:
-            from transformers import pipeline
-            pipe = pipeline(
-                "automatic-speech-recognition",
-                model="distil-whisper/distil-large-v3",
-                device="cuda"
-            )
-            result = pipe(file_path, return_timestamps=True)
         
         return result
     
     async def _run_diarization(
         self,
         file_path: str,
-        engine: DiarizationEngine
+        engine: DiarizationEngine,
+        case_id: Optional[str] = None
     ) -> Dict:
-        """Execute diarization with selected engine"""
+        """
+        Execute diarization with selected engine.
+        
+        With a case_id, per-file speaker labels are replaced by case-wide ids
+        from the case's SpeakerIndex, so the same person keeps one id across files.
+        That needs speaker embeddings, so case work is routed to Pyannote when it
+        is installed; otherwise the file keeps its per-file labels, with a warning.
+        """
+        
+        if (case_id is not None and engine != DiarizationEngine.PYANNOTE_V3
+                and self.engine_available(DiarizationEngine.PYANNOTE_V3)):
+            print(f"🔀 Case {case_id}: using {DiarizationEngine.PYANNOTE_V3.value} instead of "
+                  f"{engine.value} for speaker embeddings")
+            engine = DiarizationEngine.PYANNOTE_V3
         
         if engine == DiarizationEngine.FALCON:
             # Falcon implementation (requires Picovoice SDK)
@@ -329,15 +632,54 @@ class AstronomicalOrchestrator:
             result = {"speakers": [], "timeline": []}
             
         elif engine == DiarizationEngine.PYANNOTE_V3:
-            from pyannote.audio import Pipeline
-            pipeline = Pipeline.from_pretrained(
-                "pyannote/speaker-diarization-3.1",
-                use_auth_token="YOUR_HF_TOKEN"  # Replace with your token
-            )
-            result = pipeline(file_path)
+            pipeline = self._load_engine(engine)
+            if case_id is None:
+                result = pipeline(file_path)
+            else:
+                annotation, embeddings = pipeline(file_path, return_embeddings=True)
+                mapping = self._label_case_speakers(
+                    case_id, file_path, annotation.labels(), embeddings
+                )
+                result = annotation.rename_labels(mapping)
+        
+        if case_id is not None and isinstance(result, dict):
+            if "embeddings" in result:
+                mapping = self._label_case_speakers(
+                    case_id, file_path, result["speakers"], result["embeddings"]
+                )
+                result["speakers"] = [mapping.get(s, s) for s in result["speakers"]]
+            else:
+                print(f"⚠️  {engine.value} returned no speaker embeddings; "
+                      f"case {case_id} speaker ids not applied to {file_path}")
         
         return result
     
+    def _label_case_speakers(
+        self,
+        case_id: str,
+        file_path: str,
+        labels: List[str],
+        embeddings
+    ) -> Dict[str, str]:
+        """Map per-file speaker labels to case-wide ids, updating the case index"""
+        import numpy as np
+        from speaker_index import SpeakerIndex
+        
+        index = self.speaker_indexes.get(case_id)
+        if index is None:
+            index = self.speaker_indexes[case_id] = SpeakerIndex(case_id)
+        
+        # Speakers too short to embed come back as NaN rows; keep their local label
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        valid = ~np.isnan(embeddings).any(axis=1)
+        valid_labels = [label for label, ok in zip(labels, valid) if ok]
+        if not valid_labels:
+            return {}
+        
+        file_id = os.path.splitext(os.path.basename(file_path))[0]
+        case_ids = index.assign(embeddings[valid], file_id)
+        return dict(zip(valid_labels, case_ids))
+    
     def _merge_transcription_diarization(
         self,
         transcription: Dict,
@@ -397,7 +739,11 @@ async def main():
         quality_tier="critical"
     )
     
-    critical_config = orchestrator.select_optimal_engines(critical_profile)
+    try:
+        critical_config = orchestrator.select_optimal_engines(critical_profile)
+    except EngineUnavailableError as exc:
+        print(f"\n❌ {exc}")
+        return
     
     print(f"\nCritical case routing:")
     print(f"  Transcription: {critical_config.transcription_engine.value}")
@@ -2,17 +2,24 @@
 """Modular repository maintenance script."""
 from __future__ import annotations
 
+import fnmatch
+import hashlib
 import json
+import os
 import subprocess
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Iterable, List
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 LOGFILE = Path("setup_script.log")
 OUTDATED_LOG = Path("outdated_deps.json")
 CONFIG_FILE = Path("maintenance_config.json")
+STATE_FILE = Path(".maintenance_state.json")
+PYTHON_INPUTS = ["**/*.py", "setup.cfg", "pyproject.toml", ".flake8"]
+IGNORED_DIRS = {".git", ".venv", "venv", "node_modules", "__pycache__", ".tox", ".nox"}
 
 
 def log(message: str) -> None:
@@ -43,23 +50,119 @@ def check_outdated() -> None:
     log(f"Outdated dependencies written to {OUTDATED_LOG}")
 
 
+_digest_cache: Dict[tuple, str] = {}
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file, memoized on (path, mtime, size) for the current process."""
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _digest_cache:
+        _digest_cache[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _digest_cache[key]
+
+
+def list_files(root: Path = Path(".")) -> List[Tuple[Tuple[str, ...], Path]]:
+    """
+    Every file under ``root`` as (parts relative to root, path), in one walk.
+
+    ``IGNORED_DIRS`` are pruned before they are entered, so virtualenvs and
+    node_modules are never listed.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        rel_dir = Path(dirpath).relative_to(root).parts
+        for name in filenames:
+            files.append((rel_dir + (name,), Path(dirpath, name)))
+    files.sort(key=lambda entry: entry[1])
+    return files
+
+
+def _matches(parts: Sequence[str], pattern: Sequence[str]) -> bool:
+    """Glob match of path parts, where a ``**`` part spans zero or more directories."""
+    if not pattern:
+        return not parts
+    if pattern[0] == "**":
+        return any(_matches(parts[i:], pattern[1:]) for i in range(len(parts) + 1))
+    return bool(parts) and fnmatch.fnmatchcase(parts[0], pattern[0]) and _matches(parts[1:], pattern[1:])
+
+
+def hash_inputs(
+    patterns: Iterable[str],
+    root: Path = Path("."),
+    files: Optional[List[Tuple[Tuple[str, ...], Path]]] = None,
+) -> str:
+    """
+    Combined content hash of every file matching ``patterns`` under ``root``.
+
+    ``files`` is a listing from ``list_files`` to reuse instead of walking again;
+    contents are still re-read whenever a file's mtime or size changes.
+    """
+    if files is None:
+        files = list_files(root)
+    split = [tuple(Path(pattern).parts) for pattern in patterns]
+    digest = hashlib.sha256()
+    for parts, path in files:
+        if not any(_matches(parts, pattern) for pattern in split):
+            continue
+        try:
+            file_digest = _file_digest(path)
+        except FileNotFoundError:  # removed since the listing was taken
+            continue
+        digest.update(str(path).encode("utf-8"))
+        digest.update(file_digest.encode("ascii"))
+    return digest.hexdigest()
+
+
 @dataclass
 class Task:
+    """
+    A maintenance step.
+
+    ``deps`` name tasks that must succeed first. ``inputs`` are glob patterns;
+    when their content hash and ``command`` both match the last successful run
+    the task is skipped, so editing a command reruns it. Tasks without inputs
+    always run.
+    """
     name: str
-    action: Callable[[], None]
+    action: Callable[[], object]
+    deps: List[str] = field(default_factory=list)
+    inputs: List[str] = field(default_factory=list)
+    command: Optional[str] = None
 
-    def run(self) -> None:
+    def skip_key(self, files: List[Tuple[Tuple[str, ...], Path]]) -> str:
+        """Hash of the command together with the current inputs."""
+        digest = hashlib.sha256((self.command or self.name).encode("utf-8"))
+        digest.update(hash_inputs(self.inputs, files=files).encode("ascii"))
+        return digest.hexdigest()
+
+    def run(self) -> bool:
+        """Run the action, log its duration and return whether it succeeded."""
         log(f"Starting {self.name}")
-        self.action()
-        log(f"Finished {self.name}")
+        started = time.perf_counter()
+        try:
+            result = self.action()
+        except Exception as exc:  # a failing task must not take down the runner
+            log(f"Failed {self.name} after {time.perf_counter() - started:.2f}s: {exc}")
+            return False
+        ok = not isinstance(result, subprocess.CompletedProcess) or result.returncode == 0
+        status = "Finished" if ok else "Failed"
+        log(f"{status} {self.name} in {time.perf_counter() - started:.2f}s")
+        return ok
+
+
+def command_task(name: str, command: str, **kwargs) -> Task:
+    """Task that runs a shell ``command``."""
+    return Task(name, lambda: run(command), command=command, **kwargs)
 
 
 def default_tasks() -> List[Task]:
     return [
         Task("check_outdated", check_outdated),
-        Task("black", lambda: run("black .")),
-        Task("flake8", lambda: run("flake8")),
-        Task("tests", lambda: run("pytest tests/")),
+        command_task("black", "black .", inputs=PYTHON_INPUTS),
+        command_task("flake8", "flake8", deps=["black"], inputs=PYTHON_INPUTS),
+        command_task("tests", "pytest tests/", deps=["black"], inputs=PYTHON_INPUTS),
     ]
 
 
@@ -77,19 +180,87 @@ def load_tasks() -> List[Task]:
         if not cmd:
             continue
         name = entry.get("name", cmd)
-        tasks.append(Task(name, lambda c=cmd: run(c)))
+        tasks.append(command_task(
+            name,
+            cmd,
+            deps=entry.get("deps", []),
+            inputs=entry.get("inputs", []),
+        ))
     return tasks or default_tasks()
 
 
-def run_tasks(tasks: Iterable[Task]) -> None:
+def load_state() -> Dict[str, str]:
+    """Skip keys (command + input hash) of each task's last successful run."""
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except json.JSONDecodeError:
+        return {}
+
+
+def run_tasks(tasks: Iterable[Task], state: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Run tasks as a dependency DAG, in parallel only where tasks are independent.
+
+    Returns each task's outcome: "ok", "skipped" (inputs unchanged), "failed",
+    or "blocked" (a dependency did not succeed).
+    """
+    tasks = {t.name: t for t in tasks}
+    for task in tasks.values():
+        unknown = [d for d in task.deps if d not in tasks]
+        if unknown:
+            raise ValueError(f"Task {task.name} depends on unknown task(s): {unknown}")
+    state = load_state() if state is None else state
+    outcome: Dict[str, str] = {}
+    pending = dict(tasks)
+    running: Dict[Future, Task] = {}
+    # One directory walk per run; tasks rewrite files in place (black) rather than
+    # adding them, and changed contents are caught by the per-file digest stamps.
+    files = list_files() if any(t.inputs for t in tasks.values()) else []
+
+    def execute(task: Task) -> str:
+        if task.inputs:
+            before = task.skip_key(files)
+            if state.get(task.name) == before:
+                log(f"Skipping {task.name}: command and inputs unchanged")
+                return "skipped"
+        if not task.run():
+            return "failed"
+        if task.inputs:
+            # Hash after the run so a formatter's own rewrite does not retrigger it
+            state[task.name] = task.skip_key(files)
+        return "ok"
+
     with ThreadPoolExecutor() as exc:
-        list(exc.map(lambda t: t.run(), tasks))
+        while pending or running:
+            for name, task in list(pending.items()):
+                dep_states = [outcome.get(d) for d in task.deps]
+                if any(s in ("failed", "blocked") for s in dep_states):
+                    log(f"Blocked {name}: dependency did not succeed")
+                    outcome[name] = "blocked"
+                    del pending[name]
+                elif all(s in ("ok", "skipped") for s in dep_states):
+                    running[exc.submit(execute, task)] = task
+                    del pending[name]
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among tasks: {sorted(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome[running.pop(future).name] = future.result()
+
+    STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    return outcome
 
 
 def main() -> None:
     tasks = load_tasks()
-    run_tasks(tasks)
-    log("Maintenance tasks complete")
+    started = time.perf_counter()
+    outcome = run_tasks(tasks)
+    summary = ", ".join(f"{name}={status}" for name, status in outcome.items())
+    log(f"Maintenance tasks complete in {time.perf_counter() - started:.2f}s: {summary}")
 
 
 if __name__ == "__main__":
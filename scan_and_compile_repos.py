@@ -2,8 +2,16 @@
 scan_and_compile_repos.py
 Recursively scans provided directories for useful repos and codebases.
 Outputs a Markdown table of findings.
+
+Directories are listed in parallel with os.scandir, heavy dependency/tooling folders
+are pruned, and results stream into the table as they are found. A JSON cache of
+directory mtimes lets re-scans reuse the listing of every directory whose entries
+have not changed since the last run (only a stat per directory is paid).
 """
+import argparse
+import json
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # List of directories to scan (customize as needed)
 DIRECTORIES = [
@@ -16,44 +24,126 @@ DIRECTORIES = [
 CODE_EXTENSIONS = {'.py', '.js', '.ts', '.java', '.go', '.cpp', '.c', '.cs', '.rb', '.php', '.sh', '.ipynb'}
 NOTEWORTHY_FILES = {'README.md', 'requirements.txt', 'package.json', 'setup.py', 'Pipfile', 'environment.yml'}
 
+# Directories never descended into (dependency trees, caches, VCS internals)
+PRUNE_DIRS = {'.git', 'node_modules', '.venv', 'venv', '__pycache__', '.tox', '.mypy_cache', '.pytest_cache'}
+
+CACHE_FILE = 'scan_cache.json'
+OUTPUT_FILE = 'useful_repos.md'
+MAX_WORKERS = 16
+
 results = []
 
+
+def load_cache(path, prune):
+    """Cached listings, discarded when the prune set changed since they were made."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if sorted(data.get('prune', [])) != sorted(prune):
+        return {}
+    return data.get('dirs', {})
+
+
+def save_cache(path, prune, dirs):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'prune': sorted(prune), 'dirs': dirs}, f)
+    os.replace(tmp_path, path)
+
+
+def _scan_one(dirpath, prune, old_cache, new_cache):
+    """Findings and subdirectories of one directory, from cache if its mtime is unchanged."""
+    try:
+        mtime = os.stat(dirpath).st_mtime_ns
+    except OSError:
+        return [], []
+    cached = old_cache.get(dirpath)
+    if cached is not None and cached['mtime'] == mtime:
+        new_cache[dirpath] = cached
+        return cached['results'], cached['subdirs']
+
+    filenames, dirnames = [], []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirnames.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        filenames.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        return [], []
+
+    noteworthy = [f for f in filenames if f in NOTEWORTHY_FILES]
+    found = []
+    if '.git' in dirnames:
+        found.append({'type': 'Git Repo', 'path': dirpath, 'noteworthy': noteworthy})
+    if any(os.path.splitext(f)[1] in CODE_EXTENSIONS for f in filenames):
+        found.append({'type': 'Code Folder', 'path': dirpath, 'noteworthy': noteworthy})
+    # Optionally, check for compressed archives (not extracting for now)
+    # archives = [f for f in filenames if os.path.splitext(f)[1] in {'.zip', '.rar', '.7z'}]
+
+    subdirs = [os.path.join(dirpath, d) for d in dirnames if d not in prune]
+    new_cache[dirpath] = {'mtime': mtime, 'results': found, 'subdirs': subdirs}
+    return found, subdirs
+
+
+def scan(roots, prune=PRUNE_DIRS, old_cache=None, new_cache=None, max_workers=MAX_WORKERS):
+    """
+    Yield findings from ``roots`` as directories finish scanning.
+
+    ``old_cache`` is read for unchanged directories; every visited directory is
+    recorded in ``new_cache`` so deleted directories drop out on save.
+    """
+    old_cache = old_cache if old_cache is not None else {}
+    new_cache = new_cache if new_cache is not None else {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_scan_one, root, prune, old_cache, new_cache) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirs = future.result()
+                yield from found
+                for sub in subdirs:
+                    pending.add(pool.submit(_scan_one, sub, prune, old_cache, new_cache))
+
+
 def scan_dir(root):
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Check for git repo
-        if '.git' in dirnames:
-            results.append({
-                'type': 'Git Repo',
-                'path': dirpath,
-                'noteworthy': [f for f in filenames if f in NOTEWORTHY_FILES]
-            })
-            # Don't descend into .git
-            dirnames.remove('.git')
-        # Check for code folder
-        code_files = [f for f in filenames if os.path.splitext(f)[1] in CODE_EXTENSIONS]
-        if code_files:
-            results.append({
-                'type': 'Code Folder',
-                'path': dirpath,
-                'noteworthy': [f for f in filenames if f in NOTEWORTHY_FILES]
-            })
-        # Optionally, check for compressed archives (not extracting for now)
-        # archives = [f for f in filenames if os.path.splitext(f)[1] in {'.zip', '.rar', '.7z'}]
-        # if archives:
-        #     results.append({'type': 'Archive', 'path': dirpath, 'noteworthy': archives})
+    results.extend(scan([root]))
+
 
 def main():
-    for d in DIRECTORIES:
-        if os.path.exists(d):
-            scan_dir(d)
-    # Output Markdown table
-    with open('useful_repos.md', 'w', encoding='utf-8') as f:
+    parser = argparse.ArgumentParser(description="Scan directories for repos and code folders")
+    parser.add_argument('dirs', nargs='*', default=DIRECTORIES, help="Roots to scan")
+    parser.add_argument('--prune', action='append', default=[], help="Extra directory name to skip (repeatable)")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not write the mtime cache")
+    parser.add_argument('--cache', default=CACHE_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    prune = PRUNE_DIRS | set(args.prune)
+    old_cache = {} if args.no_cache else load_cache(args.cache, prune)
+    new_cache = {}
+    roots = [d for d in args.dirs if os.path.exists(d)]
+
+    # Output Markdown table, one row per finding as it arrives
+    count = 0
+    with open(args.output, 'w', encoding='utf-8') as f:
         f.write('| Type | Path | Noteworthy Files |\n')
         f.write('|------|------|------------------|\n')
-        for r in results:
+        for r in scan(roots, prune, old_cache, new_cache, args.workers):
             nf = ', '.join(r['noteworthy']) if r['noteworthy'] else '-'
             f.write(f"| {r['type']} | {r['path']} | {nf} |\n")
-    print(f"Scan complete. Results saved to useful_repos.md ({len(results)} entries).")
+            f.flush()
+            count += 1
+    if not args.no_cache:
+        save_cache(args.cache, prune, new_cache)
+    print(f"Scan complete. Results saved to {args.output} ({count} entries).")
 
 if __name__ == '__main__':
     main()
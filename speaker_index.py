@@ -0,0 +1,231 @@
+"""
+speaker_index.py
+Per-case speaker embedding index for consistent cross-file speaker identities.
+
+Each case keeps one centroid embedding per known speaker under
+cases/{case_id}/speakers/ as a contiguous float32 array (embeddings.npy) plus
+a small JSON sidecar (speakers.json) with ids, sample counts and the files each
+speaker appeared in. Matching is a single normalized matrix product, so a new
+file's speakers are labelled against hundreds of known speakers in well under
+a millisecond, and the index is updated in place as files are processed.
+
+Several processes (e.g. cluster workers sharing cases/) may write one case:
+every assign() takes an exclusive lock on speakers/.lock, reloads the index
+from disk, then matches and saves before releasing the lock. assign() is the
+only writer, so in-memory state never overwrites another process's update.
+"""
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CASES_DIR = 'cases'
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive inter-process lock held on ``path`` for the duration of the block."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so dot products are cosine similarities."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class SpeakerIndex:
+    """
+    Array-backed speaker store for one case.
+
+    Args:
+        case_id: Case folder name under ``cases_dir``.
+        cases_dir: Root of the case tree.
+        threshold: Minimum cosine similarity to reuse an existing speaker id.
+    """
+
+    EMBEDDINGS_FILE = 'embeddings.npy'
+    META_FILE = 'speakers.json'
+    LOCK_FILE = '.lock'
+
+    def __init__(self, case_id: str, cases_dir: str = CASES_DIR, threshold: float = 0.7):
+        self.case_id = case_id
+        self.threshold = threshold
+        self.index_dir = os.path.join(cases_dir, case_id, 'speakers')
+        self.speaker_ids: List[str] = []
+        self.counts: List[int] = []
+        self.files: Dict[str, List[str]] = {}
+        self._centroids: Optional[np.ndarray] = None  # (capacity, dim), rows [:size] valid
+        self._size = 0
+        if os.path.isdir(self.index_dir):
+            with self._locked():
+                self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Normalized centroid matrix of known speakers, shape (n_speakers, dim)."""
+        if self._centroids is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._centroids[:self._size]
+
+    def search(self, embeddings: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized top-k cosine search.
+
+        Returns:
+            (indices, scores), each shaped (n_queries, min(k, n_speakers)).
+        """
+        queries = _normalize(embeddings)
+        if self._size == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        scores = queries @ self.centroids.T
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def match(self, embeddings: np.ndarray) -> List[Optional[Tuple[str, float]]]:
+        """
+        Match one file's local speakers to known case speakers.
+
+        Speakers from the same file are matched one-to-one (two local speakers
+        never collapse onto one identity); unmatched entries are None.
+        """
+        queries = _normalize(embeddings)
+        matches: List[Optional[Tuple[str, float]]] = [None] * len(queries)
+        if self._size == 0:
+            return matches
+        scores = queries @ self.centroids.T
+        flat_order = np.argsort(-scores, axis=None)
+        rows, cols = np.unravel_index(flat_order, scores.shape)
+        used_rows, used_cols = set(), set()
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            score = float(scores[row, col])
+            if score < self.threshold:
+                break
+            if row in used_rows or col in used_cols:
+                continue
+            matches[row] = (self.speaker_ids[col], score)
+            used_rows.add(row)
+            used_cols.add(col)
+        return matches
+
+    def assign(self, embeddings: np.ndarray, file_id: str) -> List[str]:
+        """
+        Return case-level speaker ids for a file's speakers and fold them into the index.
+
+        Matched speakers update their running-mean centroid; unmatched ones are
+        added as new speakers. The whole read-match-write runs under the case
+        lock against the latest on-disk index, so concurrent writers never
+        overwrite each other or mint the same new id.
+        """
+        queries = _normalize(embeddings)
+        assigned = []
+        with self._locked():
+            self._load()  # another writer may have changed the case since we last looked
+            for query, found in zip(queries, self.match(queries)):
+                if found is None:
+                    speaker_id = self._add(query)
+                else:
+                    speaker_id = found[0]
+                    self._update(self.speaker_ids.index(speaker_id), query)
+                seen_in = self.files.setdefault(speaker_id, [])
+                if file_id not in seen_in:
+                    seen_in.append(file_id)
+                assigned.append(speaker_id)
+            self._save()
+        return assigned
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        with _file_lock(os.path.join(self.index_dir, self.LOCK_FILE)):
+            yield
+
+    def _save(self) -> None:
+        emb_path = os.path.join(self.index_dir, self.EMBEDDINGS_FILE)
+        meta_path = os.path.join(self.index_dir, self.META_FILE)
+        with open(emb_path + '.tmp', 'wb') as f:
+            np.save(f, self.centroids)
+        os.replace(emb_path + '.tmp', emb_path)
+        meta = {
+            'case_id': self.case_id,
+            'speakers': [
+                {'id': sid, 'count': count, 'files': self.files.get(sid, [])}
+                for sid, count in zip(self.speaker_ids, self.counts)
+            ]
+        }
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _add(self, vector: np.ndarray) -> str:
+        if self._centroids is None:
+            self._centroids = np.empty((16, vector.shape[0]), dtype=np.float32)
+        elif self._size == len(self._centroids):
+            grown = np.empty((len(self._centroids) * 2, self._centroids.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._centroids[:self._size]
+            self._centroids = grown
+        self._centroids[self._size] = vector
+        self._size += 1
+        speaker_id = f"{self.case_id}_SPK_{self._size:04d}"
+        self.speaker_ids.append(speaker_id)
+        self.counts.append(1)
+        return speaker_id
+
+    def _update(self, row: int, vector: np.ndarray) -> None:
+        count = self.counts[row]
+        blended = (self._centroids[row] * count + vector) / (count + 1)
+        self._centroids[row] = _normalize(blended)[0]
+        self.counts[row] = count + 1
+
+    def _load(self) -> None:
+        emb_path = os.path.join(self.index_dir, self.EMBEDDINGS_FILE)
+        meta_path = os.path.join(self.index_dir, self.META_FILE)
+        self._centroids, self._size = None, 0
+        self.speaker_ids, self.counts, self.files = [], [], {}
+        if not (os.path.exists(emb_path) and os.path.exists(meta_path)):
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        centroids = np.load(emb_path)
+        speakers: Sequence[dict] = meta.get('speakers', [])
+        if len(speakers) != len(centroids):
+            raise ValueError(f"Speaker index for {self.case_id} is inconsistent: "
+                             f"{len(speakers)} ids vs {len(centroids)} embeddings")
+        if len(centroids):
+            capacity = max(16, len(centroids) * 2)
+            self._centroids = np.empty((capacity, centroids.shape[1]), dtype=np.float32)
+            self._centroids[:len(centroids)] = centroids
+        self._size = len(centroids)
+        self.speaker_ids = [s['id'] for s in speakers]
+        self.counts = [s['count'] for s in speakers]
+        self.files = {s['id']: list(s.get('files', [])) for s in speakers}
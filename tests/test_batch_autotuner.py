@@ -0,0 +1,117 @@
+"""
+BatchAutotuner on CPU against a simulated memory limit.
+
+The injected memory probe reports free "GB" and the fake workload raises
+MemoryError when a batch exceeds the current limit.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_autotuner import BatchAutotuner  # noqa: E402
+
+ENGINE, DEVICE, CHUNK = "whisper_large_v3_turbo", "cuda:0", 30.0
+
+
+class SimulatedDevice:
+    """Each batch item costs 1 GB; ``free_gb`` is both the limit and the probe reading."""
+
+    def __init__(self, free_gb):
+        self.free_gb = free_gb
+        self.attempts = []
+
+    def probe(self, device):
+        return self.free_gb
+
+    async def work(self, batch_size):
+        self.attempts.append(batch_size)
+        if batch_size > self.free_gb:
+            raise MemoryError(f"simulated OOM at batch {batch_size}")
+        return batch_size
+
+
+def _run(tuner, device, default=16):
+    return asyncio.run(tuner.run(ENGINE, DEVICE, CHUNK, default, device.work))
+
+
+def test_oom_halves_and_retries():
+    device = SimulatedDevice(free_gb=5)
+    tuner = BatchAutotuner(memory_probe=device.probe)
+
+    assert _run(tuner, device) == 4
+    assert device.attempts == [16, 8, 4]
+    assert tuner.suggest(ENGINE, DEVICE, CHUNK, default=16) == 4
+
+
+def test_oom_at_min_batch_is_reraised():
+    device = SimulatedDevice(free_gb=0)
+    tuner = BatchAutotuner(memory_probe=device.probe, min_batch=2)
+
+    with pytest.raises(MemoryError):
+        _run(tuner, device, default=8)
+    assert device.attempts == [8, 4, 2]
+
+
+def test_non_oom_errors_propagate_without_retry():
+    tuner = BatchAutotuner(memory_probe=lambda device: None)
+    attempts = []
+
+    async def broken(batch_size):
+        attempts.append(batch_size)
+        raise ValueError("bad audio")
+
+    with pytest.raises(ValueError):
+        asyncio.run(tuner.run(ENGINE, DEVICE, CHUNK, 8, broken))
+    assert attempts == [8]
+
+
+def test_growth_bisects_towards_the_oom_ceiling():
+    device = SimulatedDevice(free_gb=10)
+    tuner = BatchAutotuner(memory_probe=device.probe, grow_after=1)
+
+    for _ in range(6):
+        _run(tuner, device)
+
+    # 16 OOMs -> 8; then 12 (midpoint, not 16) OOMs -> back to safe 8; then 10 fits
+    assert device.attempts[:4] == [16, 8, 12, 8]
+    assert max(device.attempts[1:]) <= 12
+    assert tuner.suggest(ENGINE, DEVICE, CHUNK, default=16) in (10, 11)
+
+
+def test_ceiling_is_lifted_when_headroom_returns():
+    device = SimulatedDevice(free_gb=10)
+    tuner = BatchAutotuner(memory_probe=device.probe, grow_after=1, headroom_ratio=1.5)
+    _run(tuner, device)
+    state = tuner.states[tuner.key(ENGINE, DEVICE, CHUNK)]
+    assert state.ceiling == 16
+
+    device.free_gb = 40
+    before = tuner.suggest(ENGINE, DEVICE, CHUNK, default=16)
+    assert state.ceiling is None
+    _run(tuner, device)
+    assert tuner.suggest(ENGINE, DEVICE, CHUNK, default=16) == before * 2  # doubles past the old ceiling
+    assert before * 2 > 16
+
+
+def test_state_path_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "autotune.json")
+    device = SimulatedDevice(free_gb=5)
+    tuner = BatchAutotuner(memory_probe=device.probe, state_path=path)
+    _run(tuner, device)
+
+    restored = BatchAutotuner(memory_probe=device.probe, state_path=path)
+
+    assert restored.states == tuner.states
+    assert restored.suggest(ENGINE, DEVICE, CHUNK, default=16) == 4
+    assert os.listdir(tmp_path / "state") == ["autotune.json"]  # no temp files left behind
+
+
+def test_chunk_lengths_get_separate_entries():
+    tuner = BatchAutotuner(memory_probe=lambda device: None)
+
+    assert tuner.key(ENGINE, DEVICE, 30) != tuner.key("distil_whisper_large_v3", DEVICE, 25)
+    assert tuner.key(ENGINE, DEVICE, 25) != tuner.key(ENGINE, DEVICE, 30)
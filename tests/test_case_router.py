@@ -0,0 +1,77 @@
+"""Tests for CaseRouter batch routing: conflicts and removed case folders."""
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "forensic_engine"))
+
+from case_router import CaseRouter  # noqa: E402
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=["same_device", "cross_device"])
+def router(request, tmp_path):
+    router = CaseRouter(cases_dir=str(tmp_path / "cases"), max_workers=4)
+    if request.param == "cross_device":
+        # pretend every source directory is on another filesystem
+        router._device = lambda dirpath: -1
+    return router
+
+
+def test_same_name_in_one_batch_is_a_conflict(router, tmp_path):
+    first = _write(tmp_path / "in1" / "a.wav", b"A" * 1000)
+    second = _write(tmp_path / "in2" / "a.wav", b"B" * 600)
+    mapping = {first: ("case_1", "audio"), second: ("case_1", "audio")}
+
+    reports = router.route_batch([first, second], mapping)
+
+    assert reports[0]["status"] in ("renamed", "copied")
+    assert reports[1]["status"] == "conflict"
+    assert _read(reports[0]["dest"]) == b"A" * 1000
+    assert _read(second) == b"B" * 600  # left in place, not deleted
+
+
+def test_existing_destination_is_not_overwritten(router, tmp_path):
+    existing = _write(tmp_path / "cases" / "case_1" / "audio" / "a.wav", b"old")
+    incoming = _write(tmp_path / "in" / "a.wav", b"new")
+
+    [report] = router.route_batch([incoming], {incoming: ("case_1", "audio")})
+
+    assert report["status"] == "conflict"
+    assert _read(existing) == b"old"
+    assert _read(incoming) == b"new"
+
+
+def test_removed_case_folder_is_recreated(router, tmp_path):
+    first = _write(tmp_path / "in" / "a.wav", b"a")
+    second = _write(tmp_path / "in" / "b.wav", b"b")
+    router.route_batch([first], {first: ("case_1", "audio")})
+    shutil.rmtree(tmp_path / "cases")
+
+    [report] = router.route_batch([second], {second: ("case_1", "audio")})
+
+    assert report["status"] in ("renamed", "copied"), report["error"]
+    assert _read(tmp_path / "cases" / "case_1" / "audio" / "b.wav") == b"b"
+
+
+def test_route_file_refuses_to_overwrite(tmp_path):
+    router = CaseRouter(cases_dir=str(tmp_path / "cases"))
+    _write(tmp_path / "cases" / "case_1" / "audio" / "a.wav", b"old")
+    incoming = _write(tmp_path / "in" / "a.wav", b"new")
+
+    with pytest.raises(FileExistsError):
+        router.route_file(incoming, "case_1", "audio")
+    assert _read(incoming) == b"new"
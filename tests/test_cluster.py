@@ -0,0 +1,144 @@
+"""
+Localhost multi-process tests for cluster.py.
+
+A coordinator runs in the test's event loop and workers are real
+``python cluster.py worker`` subprocesses using ``blocking_handler`` below,
+which blocks its thread for longer than the heartbeat timeout, the way model
+loading and inference do.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from cluster import Coordinator  # noqa: E402
+
+HEARTBEAT_TIMEOUT = 1.0
+HEARTBEAT_INTERVAL = 0.2
+BLOCK_SECONDS = 2.5  # well past HEARTBEAT_TIMEOUT
+
+
+async def blocking_handler(file_path, case_id):
+    time.sleep(BLOCK_SECONDS)  # deliberately blocks, like real inference
+    return {"file_path": file_path, "pid": os.getpid()}
+
+
+@pytest.fixture
+def spawn_worker():
+    procs = []
+
+    def spawn(port, *extra):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([TESTS_DIR, REPO_ROOT]))
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "cluster.py"), "worker",
+             "--connect", f"127.0.0.1:{port}",
+             "--handler", "test_cluster:blocking_handler",
+             "--heartbeat", str(HEARTBEAT_INTERVAL), *extra],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        procs.append(proc)
+        return proc
+
+    yield spawn
+    for proc in procs:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+async def _start_coordinator():
+    coordinator = Coordinator(heartbeat_timeout=HEARTBEAT_TIMEOUT, idle_retry=0.1)
+    server = await coordinator.start("127.0.0.1", 0)
+    return coordinator, server.sockets[0].getsockname()[1]
+
+
+async def _wait_until(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting for the cluster"
+        await asyncio.sleep(0.05)
+
+
+def _worker_id_of(coordinator, proc):
+    return next(wid for wid in coordinator.workers if wid.endswith(f"-{proc.pid}"))
+
+
+def test_blocking_jobs_do_not_miss_heartbeats(spawn_worker):
+    async def scenario():
+        coordinator, port = await _start_coordinator()
+        procs = [spawn_worker(port), spawn_worker(port)]
+        await _wait_until(lambda: len(coordinator.workers) == 2)
+
+        futures = [coordinator.submit(f"file-{i}.wav") for i in range(4)]
+        jobs = list(coordinator.queue)
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=30)
+
+        assert sorted(r["file_path"] for r in results) == [f"file-{i}.wav" for i in range(4)]
+        assert {r["pid"] for r in results} == {p.pid for p in procs}
+        assert [job.attempts for job in jobs] == [1, 1, 1, 1]  # nobody was dropped
+        assert len(coordinator.workers) == 2
+        await coordinator.stop()
+        return procs
+
+    for proc in asyncio.run(scenario()):
+        assert proc.wait(timeout=10) == 0
+
+
+def test_job_of_killed_worker_is_reassigned(spawn_worker):
+    async def scenario():
+        coordinator, port = await _start_coordinator()
+        procs = [spawn_worker(port), spawn_worker(port)]
+        await _wait_until(lambda: len(coordinator.workers) == 2)
+
+        future = coordinator.submit("victim.wav")
+        await _wait_until(lambda: coordinator.running)
+        busy = next(w for w in coordinator.workers.values() if w.jobs)
+        victim = next(p for p in procs if busy.worker_id.endswith(f"-{p.pid}"))
+        victim.kill()
+
+        result = await asyncio.wait_for(future, timeout=30)
+        assert result["pid"] != victim.pid
+        await coordinator.stop()
+
+    asyncio.run(scenario())
+
+
+def test_dropped_worker_reconnects_and_exits_on_shutdown(spawn_worker):
+    async def scenario():
+        coordinator, port = await _start_coordinator()
+        proc = spawn_worker(port)
+        await _wait_until(lambda: len(coordinator.workers) == 1)
+        worker_id = _worker_id_of(coordinator, proc)
+        first = coordinator.workers[worker_id]
+
+        coordinator._drop_worker(worker_id, "dropped by test")
+        await _wait_until(lambda: worker_id in coordinator.workers)
+        assert coordinator.workers[worker_id] is not first
+
+        result = await asyncio.wait_for(coordinator.submit("after.wav"), timeout=30)
+        assert result["pid"] == proc.pid
+        await coordinator.stop()
+        return proc
+
+    assert asyncio.run(scenario()).wait(timeout=10) == 0
+
+
+def test_worker_exits_cleanly_without_coordinator(spawn_worker):
+    async def free_port():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        return port
+
+    proc = spawn_worker(asyncio.run(free_port()), "--reconnect-attempts", "1")
+    assert proc.wait(timeout=20) == 0
@@ -0,0 +1,67 @@
+"""Tests for ColumnarTranscript.from_dict input shapes and save/load."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar_transcript import ColumnarTranscript, segments_from_chunks  # noqa: E402
+
+PIPELINE_RESULT = {
+    "text": " Hello there. How are you?",
+    "chunks": [
+        {"text": " Hello", "timestamp": (0.0, 0.4)},
+        {"text": " there.", "timestamp": (0.4, 0.8)},
+        {"text": " How", "timestamp": (1.0, 1.2)},
+        {"text": " are", "timestamp": (1.2, 1.3)},
+        {"text": " you?", "timestamp": (1.3, None)},
+    ],
+}
+
+
+def test_segments_from_chunks_groups_words_at_sentence_ends():
+    result = segments_from_chunks(PIPELINE_RESULT)
+
+    assert [seg["text"] for seg in result["segments"]] == [" Hello there.", " How are you?"]
+    assert [len(seg["words"]) for seg in result["segments"]] == [2, 3]
+    assert result["segments"][1]["end"] == 1.3  # open-ended last chunk ends where it starts
+
+
+def test_segments_from_chunks_splits_on_pauses():
+    chunks = [{"text": " one", "timestamp": (0.0, 0.5)}, {"text": " two", "timestamp": (5.0, 5.5)}]
+
+    result = segments_from_chunks({"text": " one two", "chunks": chunks})
+
+    assert [(seg["start"], seg["end"]) for seg in result["segments"]] == [(0.0, 0.5), (5.0, 5.5)]
+
+
+@pytest.mark.parametrize("result", [PIPELINE_RESULT, {"transcription": PIPELINE_RESULT}])
+def test_from_dict_accepts_pipeline_chunks(result):
+    transcript = ColumnarTranscript.from_dict(result)
+
+    assert len(transcript) == 2
+    assert len(transcript.words) == 5
+    assert transcript.to_dict()["segments"][0]["text"] == " Hello there."
+
+
+def test_from_dict_rejects_unknown_shapes():
+    with pytest.raises(ValueError):
+        ColumnarTranscript.from_dict({"text": "no timing at all"})
+
+
+def test_save_load_round_trip(tmp_path):
+    whisper_result = {
+        "language": "en",
+        "segments": [{
+            "start": 0.0, "end": 1.0, "text": " Hi", "speaker": "SPK_1", "avg_logprob": -0.1,
+            "words": [{"word": " Hi", "start": 0.0, "end": 1.0, "probability": 0.9}],
+        }],
+    }
+    original = ColumnarTranscript.from_dict(whisper_result)
+    original.save(str(tmp_path / "t"))
+
+    loaded = ColumnarTranscript.load(str(tmp_path / "t"))
+
+    assert loaded.to_dict() == original.to_dict()
+    assert loaded.to_dict()["segments"][0]["speaker"] == "SPK_1"
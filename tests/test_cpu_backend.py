@@ -0,0 +1,104 @@
+"""Tests for CPU shard planning and the overlap/midpoint de-duplication at cuts."""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cpu_backend  # noqa: E402
+from cpu_backend import CPUBackend, _init_worker, _keep_owned  # noqa: E402
+
+
+def _word(text, start, end):
+    return {"word": text, "start": start, "end": end, "probability": 0.9}
+
+
+def _segment(*words):
+    return {
+        "start": words[0]["start"],
+        "end": words[-1]["end"],
+        "text": "".join(w["word"] for w in words),
+        "words": list(words),
+    }
+
+
+@pytest.mark.parametrize("duration, workers, expected", [
+    (100.0, 4, [(0.0, 30.0), (30.0, 30.0), (60.0, 30.0), (90.0, 10.0)]),
+    (300.0, 4, [(0.0, 90.0), (90.0, 90.0), (180.0, 90.0), (270.0, 30.0)]),
+    (20.0, 8, [(0.0, 20.0)]),
+])
+def test_plan_shards_covers_duration_in_whole_windows(duration, workers, expected):
+    backend = CPUBackend(num_workers=workers, shard_seconds=30.0)
+
+    shards = backend.plan_shards(duration)
+
+    assert shards == expected
+    assert len(shards) <= workers
+    assert sum(length for _, length in shards) == duration
+
+
+def test_plan_shards_unknown_duration_is_one_shard():
+    assert CPUBackend(num_workers=4).plan_shards(0.0) == [(0.0, None)]
+
+
+def test_keep_owned_assigns_a_word_crossing_the_cut_to_one_shard():
+    crossing = _word(" across", 29.8, 30.4)  # midpoint 30.1
+    seg = _segment(_word(" before", 29.0, 29.5), crossing, _word(" after", 30.5, 31.0))
+
+    left = _keep_owned([seg], 0.0, 30.0)
+    right = _keep_owned([seg], 30.0, None)
+
+    assert [w["word"] for s in left for w in s["words"]] == [" before"]
+    assert [w["word"] for s in right for w in s["words"]] == [" across", " after"]
+    assert right[0]["text"] == " across after"
+    assert (right[0]["start"], right[0]["end"]) == (29.8, 31.0)
+
+
+def test_keep_owned_keeps_untouched_and_wordless_segments():
+    inside = _segment(_word(" a", 1.0, 1.5), _word(" b", 1.5, 2.0))
+    wordless_inside = {"start": 5.0, "end": 6.0, "text": " music", "words": []}
+    wordless_outside = {"start": 40.0, "end": 41.0, "text": " noise", "words": []}
+
+    kept = _keep_owned([inside, wordless_inside, wordless_outside], 0.0, 30.0)
+
+    assert kept[0] is inside  # nothing trimmed, nothing rebuilt
+    assert kept[1] is wordless_inside
+    assert len(kept) == 2
+
+
+def test_transcribe_stitches_overlapping_shards_without_loss_or_duplicates(monkeypatch):
+    # One word every 0.7 s, so plenty of words straddle the 30 s cuts
+    words = [_word(f" w{i}", i * 0.7, i * 0.7 + 0.5) for i in range(140)]
+    windows = []
+
+    def fake_shard(file_path, model_name, compute_type, start, duration, owned_start, owned_end):
+        end = float("inf") if duration is None else start + duration
+        windows.append((start, end))
+        seen = [w for w in words if w["start"] >= start and w["end"] <= end]  # only whole words
+        return _keep_owned([_segment(*seen)], owned_start, owned_end) if seen else []
+
+    backend = CPUBackend(num_workers=4, shard_seconds=30.0, overlap_seconds=2.0)
+    backend._pool = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(cpu_backend, "_transcribe_shard", fake_shard)
+    try:
+        result = asyncio.run(backend.transcribe("file.wav", "whisper_large_v3_turbo", 98.0, "int8"))
+    finally:
+        backend.shutdown()
+
+    assert [w["word"] for seg in result["segments"] for w in seg["words"]] == [w["word"] for w in words]
+    assert sorted(windows)[1][0] == 28.0  # later shards start overlap_seconds before their cut
+
+
+def test_init_worker_does_not_import_torch(monkeypatch):
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+    monkeypatch.setattr(cpu_backend, "_worker_threads", cpu_backend._worker_threads)
+    for var in cpu_backend.THREAD_ENV_VARS:
+        monkeypatch.setenv(var, "0")
+
+    _init_worker(3)
+
+    assert "torch" not in sys.modules
+    assert all(os.environ[var] == "3" for var in cpu_backend.THREAD_ENV_VARS)
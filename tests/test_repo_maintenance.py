@@ -0,0 +1,56 @@
+"""Tests for the maintenance runner's skip logic."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repo_maintenance  # noqa: E402
+from repo_maintenance import Task, run_tasks  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "module.py").write_text("x = 1\n")
+    (tmp_path / ".venv").mkdir()
+    (tmp_path / ".venv" / "vendored.py").write_text("y = 2\n")
+    return tmp_path
+
+
+def _task(command, calls):
+    return Task("lint", lambda: calls.append(command), inputs=["**/*.py"], command=command)
+
+
+def test_unchanged_command_and_inputs_are_skipped(workdir):
+    calls, state = [], {}
+
+    assert run_tasks([_task("flake8", calls)], state) == {"lint": "ok"}
+    assert run_tasks([_task("flake8", calls)], state) == {"lint": "skipped"}
+    assert calls == ["flake8"]
+
+
+def test_edited_command_reruns(workdir):
+    calls, state = [], {}
+    run_tasks([_task("flake8", calls)], state)
+
+    assert run_tasks([_task("flake8 --max-line-length 100", calls)], state) == {"lint": "ok"}
+
+
+def test_changed_input_reruns_and_ignored_dirs_do_not(workdir):
+    calls, state = [], {}
+    run_tasks([_task("flake8", calls)], state)
+
+    (workdir / ".venv" / "vendored.py").write_text("y = 3\n")
+    assert run_tasks([_task("flake8", calls)], state) == {"lint": "skipped"}
+
+    (workdir / "module.py").write_text("x = 22\n")  # new size, in case mtime did not tick
+    assert run_tasks([_task("flake8", calls)], state) == {"lint": "ok"}
+
+
+def test_list_files_prunes_ignored_dirs(workdir):
+    listed = [parts for parts, _ in repo_maintenance.list_files()]
+
+    assert ("module.py",) in listed
+    assert not any(".venv" in parts for parts in listed)
@@ -0,0 +1,72 @@
+"""Tests for case-wide speaker ids: concurrent writers and orchestrator routing."""
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_engine_orchestrator import AstronomicalOrchestrator, DiarizationEngine  # noqa: E402
+from speaker_index import SpeakerIndex  # noqa: E402
+
+
+def _voice(seed, dim=16):
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def test_stale_writers_do_not_overwrite_each_other(tmp_path):
+    cases = str(tmp_path)
+    first = SpeakerIndex("case_1", cases_dir=cases)
+    second = SpeakerIndex("case_1", cases_dir=cases)  # loaded before first writes
+
+    alice = first.assign(np.stack([_voice(1)]), "file_a")
+    bob = second.assign(np.stack([_voice(2)]), "file_b")
+
+    assert alice != bob
+    reloaded = SpeakerIndex("case_1", cases_dir=cases)
+    assert len(reloaded) == 2
+    assert reloaded.assign(np.stack([_voice(1)]), "file_c") == alice
+
+
+class FakeAnnotation:
+    def __init__(self, labels):
+        self._labels = labels
+
+    def labels(self):
+        return self._labels
+
+    def rename_labels(self, mapping):
+        return FakeAnnotation([mapping.get(label, label) for label in self._labels])
+
+
+class FakePyannote:
+    def __call__(self, file_path, return_embeddings=False):
+        annotation = FakeAnnotation(["SPEAKER_00", "SPEAKER_01"])
+        return (annotation, np.stack([_voice(1), _voice(2)])) if return_embeddings else annotation
+
+
+@pytest.fixture
+def orchestrator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    orchestrator = AstronomicalOrchestrator(device="cpu", work_dir=str(tmp_path))
+    orchestrator.engines[DiarizationEngine.PYANNOTE_V3] = FakePyannote()
+    return orchestrator
+
+
+def test_case_diarization_is_routed_to_pyannote(orchestrator):
+    orchestrator._availability[DiarizationEngine.PYANNOTE_V3] = True
+
+    result = asyncio.run(orchestrator._run_diarization("a.wav", DiarizationEngine.SORTFORMER, "case_1"))
+
+    assert result.labels() == ["case_1_SPK_0001", "case_1_SPK_0002"]
+
+
+def test_case_diarization_without_embeddings_warns(orchestrator, capsys):
+    orchestrator._availability[DiarizationEngine.PYANNOTE_V3] = False
+
+    result = asyncio.run(orchestrator._run_diarization("a.wav", DiarizationEngine.FALCON, "case_1"))
+
+    assert result == {"speakers": [], "timeline": []}
+    assert "no speaker embeddings" in capsys.readouterr().out